@@ -0,0 +1,165 @@
+"""Permutation analysis of move sequences.
+
+An algorithm is compiled once into a permutation of the puzzle's stickers and everything
+(order, cycles, affected pieces) is read off that permutation, without replaying the
+moves on a cube:
+
+    print(analyze(Solver.CYCLE_MOVE))
+    results = analyze_many(SOLVER_ALGORITHMS)     # {name: Analysis}
+"""
+import math
+
+import numpy as np
+
+from puzzles import CubeN, StickerPuzzle
+from utils import Solver
+
+# the hard-coded algorithms of utils.Solver
+SOLVER_ALGORITHMS = {
+    'cycle_move': Solver.CYCLE_MOVE,
+    'h_pattern_move': Solver.H_PATTERN_MOVE,
+    'fish_move': Solver.FISH_MOVE,
+}
+
+PIECE_TYPES = ('corner', 'edge', 'center')
+
+
+def cycles(perm):
+    """
+    :param perm: A permutation as an array, perm[i] = where the element now at i came from
+    :return: The cycles of length > 1 as lists, following each element to where it goes
+    """
+    dest = np.empty_like(perm)
+    dest[perm] = np.arange(len(perm))
+    seen = np.zeros(len(perm), dtype=bool)
+    seen[dest == np.arange(len(perm))] = True
+    result = []
+    for start in np.flatnonzero(~seen).tolist():
+        if seen[start]:
+            continue
+        cycle = []
+        i = start
+        while not seen[i]:
+            seen[i] = True
+            cycle.append(i)
+            i = int(dest[i])
+        result.append(cycle)
+    return result
+
+
+def _lcm(values):
+    return math.lcm(*values) if values else 1
+
+
+class _Pieces:
+    """Groups the stickers of a puzzle shape into pieces (cubies)"""
+
+    _cache = {}
+
+    def __init__(self, puzzle):
+        geo = puzzle._geo
+        positions = [tuple(p) for p in geo.positions.tolist()]
+        self.home = sorted(set(positions), key=lambda p: (-p[1], p[2], p[0]))
+        index = {pos: i for i, pos in enumerate(self.home)}
+        # piece index of every sticker
+        self.of_sticker = np.array([index[p] for p in positions], dtype=np.intp)
+        self.stickers = [np.flatnonzero(self.of_sticker == i) for i in range(len(self.home))]
+
+        letters = []
+        for sticker_ids in self.stickers:
+            faces = {tuple(n) for n in geo.normals[sticker_ids].tolist()}
+            letters.append("".join(letter for letter, normal in (
+                ('U', (0, 1, 0)), ('D', (0, -1, 0)), ('F', (0, 0, 1)), ('B', (0, 0, -1)),
+                ('L', (-1, 0, 0)), ('R', (1, 0, 0))) if normal in faces))
+        self.names = [name if letters.count(name) == 1 else f"{name}{pos}"
+                      for name, pos in zip(letters, self.home)]
+
+        # corners sit on an outer layer of every axis that turns, edges on all but one, ...
+        axes = [axis for axis, n in enumerate(puzzle.shape) if n > 1]
+        self.kinds = []
+        for pos in self.home:
+            inner = sum(abs(pos[axis]) != puzzle.shape[axis] - 1 for axis in axes)
+            self.kinds.append(PIECE_TYPES[inner] if inner < len(PIECE_TYPES) else 'inner')
+
+    @classmethod
+    def of(cls, puzzle):
+        if puzzle.shape not in cls._cache:
+            cls._cache[puzzle.shape] = cls(puzzle)
+        return cls._cache[puzzle.shape]
+
+
+class Analysis:
+    """The result of analyze(). Piece names are their home faces, e.g. 'UFR' or 'DL'.
+
+    order           -- how many repetitions bring the puzzle back to where it started
+    sticker_cycles  -- cycles of sticker indices (see puzzles for the sticker order)
+    piece_cycles    -- cycles of pieces moving between positions, ignoring orientation
+    twisted         -- pieces that stay in place but are turned
+    affected        -- every piece that is moved or turned
+    fixed           -- every piece left untouched
+    """
+
+    def __init__(self, move_str, perm, pieces):
+        self.moves = move_str
+        self.perm = perm
+        self.sticker_cycles = cycles(perm)
+        self.order = _lcm([len(c) for c in self.sticker_cycles])
+
+        piece_perm = pieces.of_sticker[perm[[s[0] for s in pieces.stickers]]]
+        self.piece_cycles = [[pieces.names[i] for i in c] for c in cycles(piece_perm)]
+        moved = {name for cycle in self.piece_cycles for name in cycle}
+
+        touched = set(pieces.of_sticker[np.flatnonzero(perm != np.arange(len(perm)))].tolist())
+        self.twisted = [pieces.names[i] for i in sorted(touched) if pieces.names[i] not in moved]
+        self.affected = [pieces.names[i] for i in sorted(touched)]
+        self.fixed = [name for i, name in enumerate(pieces.names) if i not in touched]
+
+        self.affected_types = {}
+        for i in sorted(touched):
+            kind = pieces.kinds[i]
+            self.affected_types[kind] = self.affected_types.get(kind, 0) + 1
+
+    @property
+    def cycle_type(self):
+        """:return: Sorted lengths of the sticker cycles"""
+        return sorted((len(c) for c in self.sticker_cycles), reverse=True)
+
+    def __str__(self):
+        cycles_str = " ".join("(" + " ".join(c) + ")" for c in self.piece_cycles) or "-"
+        types = ", ".join(f"{n} {kind}s" for kind, n in self.affected_types.items()) or "nothing"
+        return (f"{self.moves.strip()}\n"
+                f"  order: {self.order}\n"
+                f"  piece cycles: {cycles_str}\n"
+                f"  twisted in place: {' '.join(self.twisted) or '-'}\n"
+                f"  affects: {types}")
+
+    def __repr__(self):
+        return f"<Analysis order={self.order} affected={len(self.affected)} moves={self.moves.strip()!r}>"
+
+
+def analyze(move_str, puzzle=None):
+    """
+    :param move_str: Moves separated by spaces, as for Cube.sequence()
+    :param puzzle: The StickerPuzzle (or its class) the moves are for, a 3x3 cube by default
+    :return: An Analysis
+    """
+    if puzzle is None:
+        puzzle = CubeN(3)
+    elif isinstance(puzzle, type) and issubclass(puzzle, StickerPuzzle):
+        puzzle = puzzle()
+    return Analysis(move_str, puzzle.compile(move_str), _Pieces.of(puzzle))
+
+
+def analyze_many(algorithms, puzzle=None):
+    """
+    :param algorithms: A dict {name: move string} or an iterable of move strings
+    :return: A dict {name (or the move string): Analysis}
+    """
+    if not isinstance(algorithms, dict):
+        algorithms = {moves: moves for moves in algorithms}
+    return {name: analyze(moves, puzzle) for name, moves in algorithms.items()}
+
+
+if __name__ == '__main__':
+    for name, result in analyze_many(SOLVER_ALGORITHMS).items():
+        print(f"{name}: {result}\n")
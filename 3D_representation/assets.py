@@ -0,0 +1,143 @@
+"""Compiled cubie models shared by every cubie of the games.
+
+compile_model turns a model (OBJ) and its texture (PNG) into one BAM file in
+models_compressed/, which refers to the texture by a path relative to it (so the PNG ships
+with the game, and the BAM stays small), and records the SHA-256 of both sources in
+models_compressed/manifest.json. cubie_model loads that BAM once per process, recompiling
+it first if a source changed, and gives every cubie an instance of the same geometry
+instead of a copy of its own.
+
+    Entity(model=cubie_model('custom_cube', 'rubik_texture'), position=pos)
+    python assets.py            # compile (or check) the models of the games
+"""
+import argparse
+import hashlib
+import json
+import os
+
+ASSETS_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILED_DIR = os.path.join(ASSETS_DIR, "models_compressed")
+MANIFEST = os.path.join(COMPILED_DIR, "manifest.json")
+# bump when compile_model changes what it writes
+ASSETS_VERSION = 1
+# (model, texture) of the games' cubies
+CUBIES = [("custom_cube", "rubik_texture")]
+
+# (model, texture): the loaded NodePath every cubie instances
+_loaded = {}
+
+
+def file_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def compiled_path(model, texture):
+    return os.path.join(COMPILED_DIR, f"{model}+{texture}.bam")
+
+
+def _sources(model, texture):
+    return {"model": os.path.join(ASSETS_DIR, model + ".obj"), "texture": os.path.join(ASSETS_DIR, texture + ".png")}
+
+
+def _read_manifest():
+    if not os.path.exists(MANIFEST):
+        return {}
+    with open(MANIFEST) as f:
+        return json.load(f)
+
+
+def source_key(model, texture):
+    """:return: What compiled_path(model, texture) was compiled from: the version and the
+    hashes of the sources, or None if a source is missing"""
+    sources = _sources(model, texture)
+    if not all(os.path.exists(path) for path in sources.values()):
+        return None
+    return dict({name: file_hash(path) for name, path in sources.items()}, version=ASSETS_VERSION)
+
+
+def is_fresh(model, texture):
+    """:return: Whether the compiled model exists and matches its sources (a compiled model
+    whose sources are not shipped counts as fresh)"""
+    if not os.path.exists(compiled_path(model, texture)):
+        return False
+    key = source_key(model, texture)
+    return key is None or _read_manifest().get(f"{model}+{texture}") == key
+
+
+def compile_model(model, texture):
+    """Write compiled_path(model, texture) from model.obj and texture.png and record their
+    hashes in the manifest. Needs a running Ursina (for the texture loader)"""
+    from pathlib import Path
+
+    from panda3d.core import BamFile, BamWriter, Filename
+    from ursina import load_texture
+    from ursina.mesh_importer import obj_to_ursinamesh
+
+    mesh = obj_to_ursinamesh(path=Path(ASSETS_DIR), name=model, return_mesh=True)
+    mesh.setTexture(load_texture(texture, path=Path(ASSETS_DIR))._texture, 1)
+
+    os.makedirs(COMPILED_DIR, exist_ok=True)
+    path = compiled_path(model, texture)
+    tmp = path + ".tmp.bam"
+    bam = BamFile()
+    if not bam.openWrite(Filename.fromOsSpecific(tmp)):
+        raise OSError(f"Cannot write {tmp}")
+    bam.getWriter().setFileTextureMode(BamWriter.BTM_relative)
+    bam.writeObject(mesh.node())
+    bam.close()
+    os.replace(tmp, path)
+
+    manifest = _read_manifest()
+    manifest[f"{model}+{texture}"] = source_key(model, texture)
+    with open(MANIFEST + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(MANIFEST + ".tmp", MANIFEST)
+    return path
+
+
+def load_model(model, texture):
+    """:return: The compiled model as a NodePath, compiled if stale and loaded once"""
+    key = (model, texture)
+    if key not in _loaded:
+        import builtins
+
+        from panda3d.core import Filename
+
+        if not is_fresh(model, texture):
+            compile_model(model, texture)
+        _loaded[key] = builtins.loader.loadModel(Filename.fromOsSpecific(compiled_path(model, texture)))
+    return _loaded[key]
+
+
+def cubie_model(model="custom_cube", texture="rubik_texture"):
+    """:return: A new node holding an instance of the shared model, for Entity(model=...).
+    Color, texture and transparency set by the Entity go on this node, not on the shared
+    geometry"""
+    from panda3d.core import NodePath
+
+    holder = NodePath(f"{model}+{texture}")
+    load_model(model, texture).instanceTo(holder)
+    return holder
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the cubie models of the games to BAM")
+    parser.add_argument("--force", action="store_true", help="recompile fresh models too")
+    args = parser.parse_args(argv)
+
+    from panda3d.core import loadPrcFileData
+
+    loadPrcFileData("", "window-type none\naudio-library-name null")
+    from ursina import Ursina
+
+    Ursina(window_type="none")
+    for model, texture in CUBIES:
+        if args.force or not is_fresh(model, texture):
+            print("compiled", compile_model(model, texture))
+        else:
+            print("fresh", compiled_path(model, texture))
+
+
+if __name__ == '__main__':
+    main()
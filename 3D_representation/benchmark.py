@@ -0,0 +1,248 @@
+"""Benchmark suite for the cube engine, the Solver and the move optimizer.
+
+Usage:
+    python benchmark.py                                # run everything, print JSON
+    python benchmark.py -o results.json                # save the results
+    python benchmark.py --scrambles 500 --only solve   # quicker partial run
+    python benchmark.py --compare baseline.json        # flag regressions (exit code 1)
+    python benchmark.py --only startup                 # time to first frame of the games
+"""
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from puzzles import CubeN
+from utils import Cube, Solver, optimize_moves
+
+SOLVED_CUBE_STR = "OOOOOOOOOYYYWWWGGGBBBYYYWWWGGGBBBYYYWWWGGGBBBRRRRRRRRR"
+SCRAMBLE_MOVES = ["L", "R", "U", "D", "F", "B", "Li", "Ri", "Ui", "Di", "Fi", "Bi"]
+ALL_MOVES = SCRAMBLE_MOVES + ["M", "E", "S", "Mi", "Ei", "Si", "X", "Y", "Z", "Xi", "Yi", "Zi"]
+
+DEFAULT_SEED = 2023
+DEFAULT_SCRAMBLES = 10000
+SCRAMBLE_LENGTH = 25
+
+
+def make_scrambles(count, seed=DEFAULT_SEED, length=SCRAMBLE_LENGTH):
+    """Fixed, seeded corpus of scramble strings"""
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(SCRAMBLE_MOVES) for _ in range(length)) for _ in range(count)]
+
+
+def machine_info():
+    return {
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+    }
+
+
+def _time_loop(func, min_time=0.5):
+    """Call func() until min_time seconds have passed, return (calls, seconds)"""
+    calls = 0
+    start = time.perf_counter()
+    elapsed = 0.0
+    while elapsed < min_time:
+        func()
+        calls += 1
+        elapsed = time.perf_counter() - start
+    return calls, elapsed
+
+
+def _result(value, unit, higher_is_better, **extra):
+    result = {"value": value, "unit": unit, "higher_is_better": higher_is_better}
+    result.update(extra)
+    return result
+
+
+def _percentile(sorted_vals, p):
+    if not sorted_vals:
+        return 0.0
+    k = (len(sorted_vals) - 1) * p / 100
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (k - lo)
+
+
+def bench_sequence(args):
+    cube = Cube(SOLVED_CUBE_STR)
+    rng = random.Random(args.seed)
+    move_str = " ".join(rng.choice(ALL_MOVES) for _ in range(1000))
+    calls, elapsed = _time_loop(lambda: cube.sequence(move_str), args.min_time)
+    return {"sequence_moves_per_sec": _result(calls * 1000 / elapsed, "moves/s", True)}
+
+
+def bench_construction(args):
+    cube = Cube(SOLVED_CUBE_STR)
+    calls, elapsed = _time_loop(lambda: Cube(SOLVED_CUBE_STR), args.min_time)
+    init = elapsed / calls
+    calls, elapsed = _time_loop(lambda: Cube(cube), args.min_time)
+    copy = elapsed / calls
+    return {
+        "cube_init_us": _result(init * 1e6, "us", False),
+        "cube_from_cube_us": _result(copy * 1e6, "us", False),
+    }
+
+
+def bench_solve(args):
+    base = Cube(SOLVED_CUBE_STR)
+    latencies = []
+    moves = 0
+    for scramble in make_scrambles(args.scrambles, args.seed):
+        cube = Cube(base)
+        cube.sequence(scramble)
+        solver = Solver(cube)
+        start = time.perf_counter()
+        solver.solve()
+        latencies.append(time.perf_counter() - start)
+        moves += len(solver.moves)
+    latencies.sort()
+    results = {
+        "solve_latency_p%d_ms" % p: _result(_percentile(latencies, p) * 1e3, "ms", False)
+        for p in (50, 90, 99)
+    }
+    results["solve_latency_max_ms"] = _result(latencies[-1] * 1e3, "ms", False)
+    results["solve_mean_moves"] = _result(moves / len(latencies), "moves", False,
+                                          scrambles=len(latencies))
+    return results
+
+
+def bench_optimize(args):
+    rng = random.Random(args.seed)
+    moves = [rng.choice(ALL_MOVES) for _ in range(5000)]
+    calls, elapsed = _time_loop(lambda: optimize_moves(moves), args.min_time)
+    return {"optimize_moves_per_sec": _result(calls * len(moves) / elapsed, "moves/s", True)}
+
+
+def bench_state(args):
+    cube = Cube(SOLVED_CUBE_STR)
+    cube.sequence(make_scrambles(1, args.seed)[0])
+    calls, elapsed = _time_loop(cube.is_solved, args.min_time)
+    solved = elapsed / calls
+    calls, elapsed = _time_loop(cube.flat_str, args.min_time)
+    flat = elapsed / calls
+    return {
+        "is_solved_us": _result(solved * 1e6, "us", False),
+        "flat_str_us": _result(flat * 1e6, "us", False),
+    }
+
+
+def bench_nxn(args):
+    rng = random.Random(args.seed)
+    move_str = " ".join(rng.choice(SCRAMBLE_MOVES + ["Rw", "2R", "Ui"]) for _ in range(1000))
+    results = {}
+    for n in (2, 3, 5, 7, 10):
+        cube = CubeN(n)
+        calls, elapsed = _time_loop(lambda: cube.sequence(move_str), args.min_time)
+        results[f"cube{n}_sequence_moves_per_sec"] = _result(calls * 1000 / elapsed, "moves/s", True)
+    return results
+
+
+def bench_startup(args):
+    """Start every game headless in a new process and time its first frame (headless.py)"""
+    if importlib.util.find_spec("ursina") is None:
+        print("ursina is not installed, skipping startup", file=sys.stderr)
+        return {}
+    headless = os.path.join(os.path.dirname(os.path.abspath(__file__)), "headless.py")
+    results = {}
+    for cube_type in ("3x3", "3x3V2", "2x2", "floppy"):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, headless, cube_type, "--startup"], capture_output=True, text=True,
+                             check=True).stdout
+        process = time.perf_counter() - start
+        report = json.loads(out.strip().splitlines()[-1])
+        results[f"startup_{cube_type}_first_frame_ms"] = _result(report["first_frame_ms"], "ms", False)
+        results[f"startup_{cube_type}_ready_ms"] = _result(report["ready_ms"], "ms", False,
+                                                            frames=report["ready_frames"])
+        results[f"startup_{cube_type}_process_ms"] = _result(process * 1e3, "ms", False)
+    return results
+
+
+BENCHMARKS = {
+    "sequence": bench_sequence,
+    "construction": bench_construction,
+    "solve": bench_solve,
+    "optimize": bench_optimize,
+    "state": bench_state,
+    "nxn": bench_nxn,
+    "startup": bench_startup,
+}
+
+
+def run(args):
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if args.only and name not in args.only:
+            continue
+        print(f"running {name}...", file=sys.stderr)
+        results.update(bench(args))
+    return {
+        "machine": machine_info(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"seed": args.seed, "scrambles": args.scrambles, "min_time": args.min_time},
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold):
+    """
+    :return: A list of (name, baseline value, current value, relative change) for every
+        metric that got worse by more than threshold (0.10 == 10%)
+    """
+    regressions = []
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None or not base["value"]:
+            continue
+        change = (cur["value"] - base["value"]) / base["value"]
+        worse = -change if base["higher_is_better"] else change
+        if worse > threshold:
+            regressions.append((name, base["value"], cur["value"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="write the JSON results to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="relative slowdown that counts as a regression (default 0.10)")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), help="run only these benchmarks")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--scrambles", type=int, default=DEFAULT_SCRAMBLES,
+                        help="size of the Solver scramble corpus (default 10000)")
+    parser.add_argument("--min-time", type=float, default=0.5,
+                        help="minimum seconds spent on each micro benchmark")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, old, new, change in regressions:
+            print(f"REGRESSION {name}: {old:.4g} -> {new:.4g} ({change:+.1%})", file=sys.stderr)
+        if regressions:
+            return 1
+        print("no regressions", file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,399 @@
+"""Logic shared by the ursina games (Rubiks_Cube*.py).
+
+The games turn a layer by parenting its cubies to PARENT and animating PARENT's rotation.
+LayerGrid finds the cubies of a layer by their integer grid coordinates, so a turn only
+touches the entities that move instead of testing the position of every cubie, and
+TurnPivot moves them back to the scene once, when the animation ends. MoveQueue plays
+moves one after another from the frame update, instead of chains of invoke() timers, and
+plan_playback fits a long list of turns (a solve) into a target duration. Builder spreads
+the construction of the secondary scene and UI over the first frames.
+"""
+import collections
+import math
+from time import perf_counter
+
+# positions are multiplied by this before rounding, so the half units of the 2x2 stay exact
+GRID_SCALE = 2
+# slack of the comparisons of summed frame times, so n frames of 1 / n seconds make a second
+TIME_EPSILON = 1e-6
+
+
+def grid_key(position):
+    """:return: The integer grid coordinates of a position (a Vec3 or any x, y, z sequence)"""
+    return (round(GRID_SCALE * position[0]), round(GRID_SCALE * position[1]), round(GRID_SCALE * position[2]))
+
+
+def layer_keys(positions):
+    """:return: The grid keys of a layer given as a set of positions (e.g. game.layers['LEFT'])"""
+    return frozenset(grid_key(position) for position in positions)
+
+
+class LayerGrid:
+    """Index of the cubie entities by grid_key(entity.position)"""
+
+    def __init__(self, entities=()):
+        self.cells = {}
+        # id(entity): the key the entity is stored under
+        self._keys = {}
+        for entity in entities:
+            self._add(entity)
+
+    def _add(self, entity):
+        key = grid_key(entity.position)
+        self.cells[key] = entity
+        self._keys[id(entity)] = key
+
+    def at(self, keys):
+        """:return: The entities at the given grid keys"""
+        cells = self.cells
+        return [cells[key] for key in keys if key in cells]
+
+    def update(self, entities):
+        """Re-index entities whose positions changed (a turned layer)"""
+        for entity in entities:
+            key = self._keys.pop(id(entity), None)
+            if key is not None and self.cells.get(key) is entity:
+                del self.cells[key]
+        for entity in entities:
+            self._add(entity)
+
+    def __len__(self):
+        return len(self.cells)
+
+
+def snap_position(position):
+    """:return: position moved to the nearest grid point"""
+    return tuple(k / GRID_SCALE for k in grid_key(position))
+
+
+def snap_rotation(quat):
+    """:return: quat (a panda3d Quat) moved to the nearest rotation that maps the axes onto
+    the axes: every entry of its rotation matrix rounded to -1, 0 or 1. Rounding the Euler
+    angles instead fails at gimbal lock (pitch 90), where only the sum or difference of the
+    other two angles is defined"""
+    from panda3d.core import LMatrix3f, Quat
+
+    matrix = LMatrix3f()
+    quat.extractToMatrix(matrix)
+    snapped = Quat()
+    snapped.setFromMatrix(LMatrix3f(*(round(matrix[i][j]) for i in range(3) for j in range(3))))
+    return snapped
+
+
+def reset_entities(entities, positions, grid):
+    """Put entities back at positions (in the same order), unrotated, and re-index them in
+    grid: a reset that reuses the cubies instead of creating new ones"""
+    for entity, position in zip(entities, positions):
+        entity.position = position
+        entity.rotation = (0, 0, 0)
+    grid.update(entities)
+
+
+class _Callback:
+    """A step of an ursina Sequence that calls func"""
+
+    def __init__(self, func):
+        self.func = func
+        self.delay = 0
+        self.finished = False
+
+    def __call__(self):
+        self.finished = True
+        return self.func()
+
+
+class TurnPivot:
+    """Turns layers of a LayerGrid about the origin with the pivot entity `parent`.
+
+    The cubies of a turn are parented to `parent` and its rotation is animated. When the
+    animation ends they go back to `root` (the scene) in one pass, with their positions and
+    rotations snapped to the grid, so long playbacks do not accumulate float error. Only
+    the entities of the current turn are ever touched.
+    """
+
+    def __init__(self, parent, root, grid):
+        self.parent = parent
+        self.root = root
+        self.grid = grid
+        # entities parented to `parent` by the current turn
+        self.attached = []
+        self.animation = None
+        self._target = None
+
+    @property
+    def busy(self):
+        return bool(self.attached)
+
+    def turn(self, keys, axis, angle, duration=0):
+        """Turn the entities at the grid keys `angle` degrees about axis ('x', 'y' or 'z'),
+        animated over duration seconds (at once if 0). A running turn is finished first."""
+        self.finish()
+        self.attached = self.grid.at(keys)
+        for entity in self.attached:
+            entity.parent = self.parent
+        self._target = ('rotation_' + axis, angle)
+        if duration:
+            self.animation = self.parent.animate(self._target[0], angle, duration=duration)
+            self.animation.append(_Callback(self.bake))
+        else:
+            self.bake()
+
+    def finish(self):
+        """Jump to the end of the running turn"""
+        if self.animation is not None:
+            self.animation.kill()
+        self.bake()
+
+    def bake(self):
+        """Move the turned entities back to root and re-index them. :return: The entities"""
+        moved = self.attached
+        if not moved:
+            return moved
+        setattr(self.parent, *self._target)
+        for entity in moved:
+            entity.world_parent = self.root
+            entity.position = snap_position(entity.position)
+            entity.setQuat(snap_rotation(entity.getQuat()))
+        self.parent.rotation = (0, 0, 0)
+        self.attached, self.animation, self._target = [], None, None
+        self.grid.update(moved)
+        return moved
+
+
+class _Move:
+
+    def __init__(self, func, args, delay, on_done, queued_at):
+        self.func = func
+        self.args = args
+        self.delay = delay
+        self.on_done = on_done
+        # MoveQueue.clock when the move was queued, started and finished
+        self.queued_at = queued_at
+        self.started_at = None
+        self.done_at = None
+
+    @property
+    def name(self):
+        return ' '.join([self.func.__name__] + [str(arg) for arg in self.args])
+
+
+class MoveQueue:
+    """Plays moves one at a time, driven by update(dt) every frame.
+
+    A move is a function that starts a turn on the TurnPivot, e.g. game.rotate_side. The
+    next move starts only once the pivot has baked the previous turn and the next move's
+    delay has passed, so no timer is ever left waiting. on_idle() is called whenever the
+    last pending move has finished, and on_move(move) after every move (see telemetry.py).
+    """
+
+    def __init__(self, pivot=None, on_idle=None):
+        self.pivot = pivot
+        self.on_idle = on_idle
+        self.on_move = None
+        # seconds of update(dt) calls, the time base of the moves' timestamps
+        self.clock = 0.0
+        self.pending = collections.deque()
+        self.current = None
+        self.paused = False
+        # seconds since the last move finished (the first move does not wait)
+        self._elapsed = float('inf')
+        self.ticker = None
+
+    def attach(self):
+        """Create the ursina entity that calls update() every frame"""
+        from ursina import Entity, time
+
+        self.ticker = Entity(name='move_queue')
+        self.ticker.update = lambda: self.update(time.dt)
+        return self.ticker
+
+    @property
+    def idle(self):
+        return self.current is None and not self.pending
+
+    def __len__(self):
+        """Moves not finished yet, the running one included"""
+        return len(self.pending) + (self.current is not None)
+
+    def enqueue(self, func, *args, delay=0, on_done=None):
+        """
+        Play func(*args) once the moves before it have finished.
+        :param delay: Seconds to wait after the previous move finished
+        :param on_done: Called when the turn started by func has finished
+        """
+        move = _Move(func, args, delay, on_done, self.clock)
+        self.pending.append(move)
+        return move
+
+    def cancel(self, finish=False):
+        """Drop the pending moves (the running one still ends, at once if finish).
+        :return: How many moves were dropped"""
+        dropped = len(self.pending)
+        self.pending.clear()
+        if finish and self.current is not None:
+            self.pivot.finish()
+            self._complete()
+        return dropped
+
+    def pause(self):
+        self.paused = True
+
+    def resume(self):
+        self.paused = False
+
+    def _complete(self):
+        move, self.current = self.current, None
+        move.done_at = self.clock
+        self._elapsed = 0.0
+        if move.on_done is not None:
+            move.on_done()
+        if self.on_move is not None:
+            self.on_move(move)
+        if not self.pending and self.on_idle is not None:
+            self.on_idle()
+
+    def update(self, dt):
+        self.clock += dt
+        if self.paused:
+            return
+        self._elapsed += dt
+        while True:
+            if self.current is not None:
+                if self.pivot.busy:
+                    return
+                self._complete()
+            if not self.pending or self._elapsed + TIME_EPSILON < self.pending[0].delay:
+                return
+            self.current = self.pending.popleft()
+            self.current.started_at = self.clock
+            self.current.func(*self.current.args)
+
+
+def merge_turns(turns):
+    """
+    Merge consecutive turns of the same layer into one; turns that add up to a full turn
+    disappear (so the turns around them may merge too).
+    :param turns: (layer, angle) pairs
+    :return: (layer, angle) pairs with angles in [-180, 180)
+    """
+    merged = []
+    for layer, angle in turns:
+        if merged and merged[-1][0] == layer:
+            angle += merged.pop()[1]
+        angle = (angle + 180) % 360 - 180
+        if angle:
+            merged.append((layer, angle))
+    return merged
+
+
+def animation_length(duration):
+    """:return: Seconds ursina's Entity.animate really takes for duration: it plays
+    resolution + 1 steps of duration / resolution, with resolution = int(60 * duration)"""
+    resolution = max(int(duration * 60), 1)
+    return duration * (resolution + 1) / resolution
+
+
+def turn_time(duration, delay, frame_time):
+    """:return: Seconds a turn really takes in a MoveQueue updated every frame_time seconds:
+    its delay and its animation_length rounded up to whole frames (the pivot bakes the turn
+    in the animation's last frame). An instant turn (duration 0) adds no frame of its own"""
+    frames = math.ceil((delay - TIME_EPSILON) / frame_time)
+    if duration:
+        frames += math.ceil((animation_length(duration) - TIME_EPSILON) / frame_time)
+    return frames * frame_time
+
+
+def plan_playback(turns, total_time=None, animation_time=0.3, delay=0.0, min_animation_time=0.05,
+                  frame_time=1 / 60):
+    """
+    Plan the playback of turns (merged with merge_turns) so it lasts total_time at most.
+    Every turn counts at its turn_time, its real cost in frames, and one more frame is
+    budgeted for the frame in which the queue starts the first turn. The animation time
+    and the delay between turns are scaled down together; when that would make an
+    animation shorter than min_animation_time, the turns that do not fit are applied at
+    once (duration 0, all of them within that first frame) and only the last ones are
+    animated.
+    :param turns: (layer, angle) pairs
+    :param total_time: Seconds, None to keep animation_time and delay
+    :param frame_time: Seconds per frame of the MoveQueue that plays the turns
+    :return: (layer, angle, duration, delay) tuples, for MoveQueue.enqueue
+    """
+    turns = merge_turns(turns)
+    cost = lambda scale: len(turns) * turn_time(animation_time * scale, delay * scale, frame_time)
+    if total_time is None or not turns:
+        return [(layer, angle, animation_time, delay) for layer, angle in turns]
+    budget = total_time - frame_time
+    if cost(1) <= budget:
+        return [(layer, angle, animation_time, delay) for layer, angle in turns]
+
+    # the largest scale that fits (cost only grows with the scale); a scale fits only if a
+    # slightly larger one does, so no duration ends a hair past a frame (costing one more)
+    fits = lambda scale: cost(scale * (1 + 1e-3)) <= budget
+    low, high = min_animation_time / animation_time, 1.0
+    if low < high and fits(low):
+        for _ in range(30):
+            middle = (low + high) / 2
+            if fits(middle):
+                low = middle
+            else:
+                high = middle
+        return [(layer, angle, animation_time * low, delay * low) for layer, angle in turns]
+
+    animated = int(budget / turn_time(min_animation_time, 0, frame_time) + TIME_EPSILON)
+    animated = max(0, min(animated, len(turns)))
+    instant = len(turns) - animated
+    return ([(layer, angle, 0, 0) for layer, angle in turns[:instant]] +
+            [(layer, angle, min_animation_time, 0) for layer, angle in turns[instant:]])
+
+
+class Builder:
+    """Runs construction steps from the frame update, a few per frame.
+
+    A task is a generator that builds part of the scene and yields between steps (after
+    each button, say). Nothing runs in the first `wait_frames` frames, so the first frame,
+    with the cube, is not held back by the rest; then steps run every frame until `budget`
+    seconds are spent (at least one step per frame).
+    """
+
+    def __init__(self, budget=0.008, wait_frames=1):
+        self.budget = budget
+        self.wait_frames = wait_frames
+        self.tasks = collections.deque()
+        self.ticker = None
+
+    def attach(self):
+        """Create the ursina entity that calls update() every frame, until done"""
+        from ursina import Entity
+
+        self.ticker = Entity(name='builder', update=self.update)
+        return self.ticker
+
+    def add(self, task):
+        self.tasks.append(task)
+
+    @property
+    def done(self):
+        return not self.tasks
+
+    def _step(self):
+        try:
+            next(self.tasks[0])
+        except StopIteration:
+            self.tasks.popleft()
+
+    def update(self):
+        if self.wait_frames:
+            self.wait_frames -= 1
+            return
+        start = perf_counter()
+        while self.tasks:
+            self._step()
+            if perf_counter() - start >= self.budget:
+                break
+        if self.done and self.ticker is not None:
+            self.ticker.enabled = False
+
+    def finish(self):
+        """Run every remaining step now"""
+        while self.tasks:
+            self._step()
@@ -0,0 +1,169 @@
+"""Run the ursina games without a window, on simulated time.
+
+The game is built with Panda3D's 'none' window type, so no display or GPU is needed, and
+every frame advances the clock by a fixed dt instead of the wall clock. The animations,
+the MoveQueue and the solve delays play out exactly as in the game, only as fast as the
+CPU allows. Ursina allows one app per process, so there is one HeadlessGame per process.
+
+    runner = HeadlessGame("3x3")
+    runner.game.shuffle_cube()
+    runner.run_until_idle()                            # simulated seconds it took
+    python headless.py 3x3 --sessions 20 --times /tmp/times.csv
+    python headless.py 3x3V2 --startup                 # time to first frame, in ms
+    python headless.py 3x3 --check 1000                # undo a long history, exit 1 if unsolved
+"""
+import argparse
+import importlib
+import json
+import sys
+import time
+
+from panda3d.core import loadPrcFileData
+
+from utils2 import SimRNG, random_choice
+
+# cube type (as recorded in times.csv): game module
+GAMES = {"3x3": "Rubiks_Cube3x3", "3x3V2": "Rubiks_Cube3x3_V2", "2x2": "Rubiks_Cube2x2",
+         "floppy": "Rubiks_Cube_Floppy"}
+FPS = 60
+
+
+def cube_state(cubes):
+    """:return: Position and orientation (forward and up axes) of every cubie, snapped to
+    the grid so states can be compared"""
+    return tuple((tuple(round(2 * v) for v in cube.world_position),
+                  tuple(round(v) for v in cube.forward), tuple(round(v) for v in cube.up))
+                 for cube in cubes)
+
+
+class HeadlessGame:
+    """A Game of one of the GAMES, without a window and driven frame by frame"""
+
+    def __init__(self, cube_type="3x3", fps=FPS):
+        loadPrcFileData("", "window-type none\naudio-library-name null")
+        from ursina import application
+
+        application.calculate_dt = False
+        self.dt = 1 / fps
+        self.frames = 0
+        self.game = importlib.import_module(GAMES[cube_type]).Game(window_type="none")
+        self.app = self.game.ursina_instance
+        self.game.frame_time = self.dt
+        self.solved_state = cube_state(self.game.CUBES)
+
+    @property
+    def seconds(self):
+        """Simulated seconds since the game started"""
+        return self.frames * self.dt
+
+    def step(self, frames=1):
+        for _ in range(frames):
+            time.dt = time.dt_unscaled = self.dt
+            self.app.step()
+            self.frames += 1
+
+    def run(self, seconds):
+        self.step(round(seconds / self.dt))
+
+    def run_until_idle(self, timeout=3600):
+        """
+        Step until the game's MoveQueue has played every move.
+        :param timeout: Simulated seconds before giving up (RuntimeError)
+        :return: The simulated seconds it took
+        """
+        start = self.frames
+        while not self.game.queue.idle:
+            if (self.frames - start) * self.dt > timeout:
+                raise RuntimeError(f"Moves still pending after {timeout} simulated seconds")
+            self.step()
+        return (self.frames - start) * self.dt
+
+    @property
+    def solved(self):
+        return cube_state(self.game.CUBES) == self.solved_state
+
+
+def run_sessions(cube_type, sessions, fps=FPS):
+    """Shuffle and solve sessions times. :return: A summary dict"""
+    runner = HeadlessGame(cube_type, fps)
+    solved = 0
+    wall = time.perf_counter()
+    for _ in range(sessions):
+        runner.game.shuffle_cube()
+        runner.run_until_idle()
+        runner.game.rotate_to_solve()
+        runner.run_until_idle()
+        solved += runner.solved
+    wall = time.perf_counter() - wall
+    return {"cube_type": cube_type, "sessions": sessions, "solved": solved, "frames": runner.frames,
+            "simulated_s": round(runner.seconds, 3), "wall_s": round(wall, 3),
+            "speedup": round(runner.seconds / wall, 1)}
+
+
+def check_long_solve(cube_type, moves=1000, fps=FPS, seeds=range(10)):
+    """For every seed, apply `moves` random moves at once, let the game solve them (merged
+    turns, fit into its max_solve_time) and reset it. :return: A summary dict; "ok" is
+    whether every solve ended solved within max_solve_time"""
+    runner = HeadlessGame(cube_type, fps)
+    game = runner.game
+    names = list(game.moves)
+    solved, seconds = 0, []
+    for seed in seeds:
+        rng = SimRNG(seed)
+        for _ in range(moves):
+            move = random_choice(names, rng=rng)
+            game.rotate_side_without_animation(move)
+            game.movimientos.append(move)
+        game.rotate_to_solve()
+        seconds.append(runner.run_until_idle())
+        solved += runner.solved
+        game.reset_cube()
+    return {"cube_type": cube_type, "moves": moves, "runs": len(seconds), "solved": solved,
+            "max_simulated_s": round(max(seconds), 3), "max_solve_time": game.max_solve_time,
+            "ok": solved == len(seconds) and max(seconds) <= game.max_solve_time}
+
+
+def measure_startup(cube_type, fps=FPS):
+    """Time the start of a game in this process (ursina and the game are imported here, so
+    call it in a new process). :return: Milliseconds until the game is built, its first
+    frame is done and the scene its Builder defers is complete"""
+    start = time.perf_counter()
+    runner = HeadlessGame(cube_type, fps)
+    built = time.perf_counter()
+    runner.step()
+    first_frame = time.perf_counter()
+    while not runner.game.builder.done:
+        runner.step()
+    ready = time.perf_counter()
+    return {"cube_type": cube_type, "construct_ms": 1000 * (built - start),
+            "first_frame_ms": 1000 * (first_frame - start), "ready_ms": 1000 * (ready - start),
+            "ready_frames": runner.frames}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Shuffle and solve a game headless, on simulated time")
+    parser.add_argument("cube_type", nargs="?", default="3x3", choices=sorted(GAMES))
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--fps", type=int, default=FPS, help="simulated frames per second")
+    parser.add_argument("--times", help="record the solves in this file instead of times.csv")
+    parser.add_argument("--startup", action="store_true", help="only time the start of the game (one JSON line)")
+    parser.add_argument("--check", type=int, metavar="MOVES",
+                        help="solve histories of MOVES random moves; exit status 1 if one does not end solved "
+                             "within the game's max_solve_time")
+    args = parser.parse_args(argv)
+    if args.startup:
+        print(json.dumps(measure_startup(args.cube_type, args.fps)))
+        return
+    if args.times:
+        from utils2 import set_times_path
+
+        set_times_path(args.times)
+    if args.check:
+        result = check_long_solve(args.cube_type, args.check, args.fps)
+        print(json.dumps(result, indent=1))
+        sys.exit(0 if result["ok"] else 1)
+    print(json.dumps(run_sessions(args.cube_type, args.sessions, args.fps), indent=1))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,366 @@
+"""Solving-time models of the players, fitted to recorded data.
+
+For every (cube type, player) in a times.csv file or a store directory, a normal (truncated
+at 0), a log-normal and a gamma distribution are fitted to the solving times and scored
+with AIC and the Kolmogorov-Smirnov statistic. Groups whose times are all equal have no
+distribution to fit and are left out. The fits are saved to a JSON file
+next to the data, keyed by its size and modification time, and only redone when it changes.
+
+    models = fit_models("../Graphs/times.csv")
+    models.best("3x3", "e")                       # the PlayerModel with the lowest AIC
+    models.sample("3x3", "e", 10000, rng=SimRNG(1))
+    python player_models.py ../Graphs/times.csv   # print the fits
+    python player_models.py --check               # the normal fit keeps the data's mean
+"""
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+from scipy.special import digamma, gammaln, gammainc, log_ndtr, ndtr, polygamma
+
+from utils2 import TIMES_CSV, SimRNG, as_generator, truncated_normal
+
+DISTRIBUTIONS = ("normal", "lognormal", "gamma")
+# the KS statistic is computed on at most this many values of a group
+KS_SAMPLE = 200000
+# bump when the saved fits change
+MODELS_VERSION = 3
+# the normal fits stop at mu = -MAX_TAIL * sigma (see _truncated_normal_fit)
+MAX_TAIL = 20
+
+
+class PlayerModel:
+    """A fitted distribution of solving times.
+
+    normal -- params mu, sigma of the normal before its truncation at 0
+    lognormal -- params mu, sigma of the logarithm of the time
+    gamma -- params shape, scale
+    """
+
+    def __init__(self, dist, params, n=0, loglik=None, aic=None, ks=None):
+        if dist not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution: {dist!r}")
+        self.dist = dist
+        self.params = dict(params)
+        self.n = n
+        self.loglik = loglik
+        self.aic = aic
+        self.ks = ks
+
+    def sample(self, size=None, rng=None):
+        """Draw size solving times; rng is a SimRNG or numpy Generator. Normal models are
+        truncated at 0 so no time is negative"""
+        rng = as_generator(rng)
+        p = self.params
+        if self.dist == "normal":
+            return truncated_normal(p["mu"], p["sigma"], 0, np.inf, size, rng)
+        if self.dist == "lognormal":
+            return rng.lognormal(p["mu"], p["sigma"], size)
+        return rng.gamma(p["shape"], p["scale"], size)
+
+    def cdf(self, x):
+        x = np.asarray(x, dtype=float)
+        p = self.params
+        if self.dist == "normal":
+            # 1 - P(time > x) / P(time > 0), from the survival function so it stays exact in the tail
+            log_above = log_ndtr((p["mu"] - np.maximum(x, 0)) / p["sigma"]) - log_ndtr(p["mu"] / p["sigma"])
+            return -np.expm1(log_above)
+        with np.errstate(divide="ignore"):
+            if self.dist == "lognormal":
+                return ndtr((np.log(x) - p["mu"]) / p["sigma"])
+            return gammainc(p["shape"], np.maximum(x, 0) / p["scale"])
+
+    @property
+    def mean(self):
+        p = self.params
+        if self.dist == "normal":
+            return _truncated_moments(p["mu"], p["sigma"], 1)[1]
+        if self.dist == "lognormal":
+            return math.exp(p["mu"] + p["sigma"] ** 2 / 2)
+        return p["shape"] * p["scale"]
+
+    def to_dict(self):
+        return {"dist": self.dist, "params": self.params, "n": self.n, "loglik": self.loglik,
+                "aic": self.aic, "ks": self.ks}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __repr__(self):
+        params = ", ".join(f"{k}={v:.4g}" for k, v in self.params.items())
+        return f"<PlayerModel {self.dist}({params}) aic={self.aic:.1f} ks={self.ks:.4f}>"
+
+
+def _gamma_shape(log_mean, mean_log, iterations=10):
+    """MLE of the gamma shape from log(mean(x)) and mean(log(x)), by Minka's
+    generalized Newton iteration"""
+    s = log_mean - mean_log
+    if s <= 0:
+        # every value equal: the shape diverges
+        return math.inf
+    shape = (3 - s + math.sqrt((s - 3) ** 2 + 24 * s)) / (12 * s)
+    for _ in range(iterations):
+        step = (mean_log - log_mean + math.log(shape) - digamma(shape)) / (
+            shape ** 2 * (1 / shape - polygamma(1, shape)))
+        shape = 1 / (1 / shape + step)
+    return float(shape)
+
+
+def _truncated_moments(mu, sigma, k):
+    """E[x**i], i = 0..k, of the normal(mu, sigma) truncated at 0"""
+    t = mu / sigma
+    # density over mass at the truncation point, phi(t) / Phi(t), kept finite in the tail
+    ratio = math.exp(-t * t / 2 - float(log_ndtr(t))) / math.sqrt(2 * math.pi)
+    moments = [1.0, mu + sigma * ratio]
+    for i in range(2, k + 1):
+        moments.append(mu * moments[i - 1] + (i - 1) * sigma ** 2 * moments[i - 2])
+    return moments
+
+
+def _truncated_loglik(a, b, mean, mean_sq):
+    """Log-likelihood per value of the normal truncated at 0 with natural parameters
+    a = mu / sigma**2, b = 1 / sigma**2, from mean(x) and mean(x**2)"""
+    return (a * mean - b * mean_sq / 2 - a * a / (2 * b) - math.log(2 * math.pi / b) / 2
+            - float(log_ndtr(a / math.sqrt(b))))
+
+
+def _truncated_normal_fit(mean, var, iterations=100):
+    """MLE (mu, sigma) of the normal truncated at 0 from mean(x) and var(x), by Newton's
+    method on its natural parameters, where the log-likelihood is concave. The step is the
+    difference between the data's and the model's moments, scaled by the inverse of their
+    covariance, and is halved until the likelihood does not decrease.
+
+    Data at least as spread as an exponential (var >= mean**2) has no maximum: the
+    likelihood keeps rising as mu -> -inf, towards an exponential. The fit stops at
+    mu = -MAX_TAIL * sigma, where the model is already close to it"""
+    mean_sq = var + mean ** 2
+    a, b = mean / var, 1 / var
+    loglik = _truncated_loglik(a, b, mean, mean_sq)
+    for _ in range(iterations):
+        m = _truncated_moments(a / b, 1 / math.sqrt(b), 4)
+        gradient = np.array([mean - m[1], (m[2] - mean_sq) / 2])
+        cov = m[3] - m[1] * m[2]
+        fisher = np.array([[m[2] - m[1] ** 2, -cov / 2], [-cov / 2, (m[4] - m[2] ** 2) / 4]])
+        step = np.linalg.solve(fisher, gradient)
+        scale = 1.0
+        while True:
+            new_a, new_b = a + scale * step[0], b + scale * step[1]
+            if new_b > 0 and new_a / math.sqrt(new_b) >= -MAX_TAIL:
+                new_loglik = _truncated_loglik(new_a, new_b, mean, mean_sq)
+                if new_loglik >= loglik:
+                    break
+            scale /= 2
+            if scale < 1e-10:
+                return float(a / b), float(1 / math.sqrt(b))
+        done = abs(scale * step[0]) <= 1e-12 * abs(a) + 1e-300 and abs(scale * step[1]) <= 1e-12 * b
+        a, b, loglik = new_a, new_b, new_loglik
+        if done:
+            break
+    return float(a / b), float(1 / math.sqrt(b))
+
+
+def fit_normal(x):
+    """Maximum likelihood fit of the normal truncated at 0, the model sample() draws from;
+    mu and sigma are those of the normal before its truncation"""
+    mean, var = float(x.mean()), float(x.var())
+    mu, sigma = _truncated_normal_fit(mean, var)
+    loglik = len(x) * _truncated_loglik(mu / sigma ** 2, 1 / sigma ** 2, mean, var + mean ** 2)
+    return PlayerModel("normal", {"mu": mu, "sigma": sigma}, len(x), loglik)
+
+
+def fit_lognormal(x, log_x):
+    mu, sigma = float(log_x.mean()), float(log_x.std())
+    loglik = -len(x) / 2 * (math.log(2 * math.pi * sigma ** 2) + 1) - float(log_x.sum())
+    return PlayerModel("lognormal", {"mu": mu, "sigma": sigma}, len(x), loglik)
+
+
+def fit_gamma(x, log_x):
+    mean, mean_log = float(x.mean()), float(log_x.mean())
+    shape = _gamma_shape(math.log(mean), mean_log)
+    scale = mean / shape
+    loglik = len(x) * ((shape - 1) * mean_log - shape - shape * math.log(scale) - float(gammaln(shape)))
+    return PlayerModel("gamma", {"shape": shape, "scale": scale}, len(x), loglik)
+
+
+def ks_statistic(model, x_sorted):
+    """Largest distance between the empirical CDF of x_sorted and the model's CDF"""
+    n = len(x_sorted)
+    cdf = model.cdf(x_sorted)
+    return float(max((np.arange(1, n + 1) / n - cdf).max(), (cdf - np.arange(n) / n).max()))
+
+
+def fit(values, rng=0):
+    """
+    Fit every distribution of DISTRIBUTIONS to values (log-normal and gamma only if all
+    values are positive). ValueError if values has fewer than 2 distinct values.
+    :param rng: Seed or Generator for the subsample the KS statistic is computed on
+    :return: {distribution name: PlayerModel}
+    """
+    x = np.asarray(values, dtype=float)
+    if len(x) < 2 or x.min() == x.max():
+        raise ValueError(f"Need at least 2 distinct values to fit, got {len(np.unique(x))}")
+    models = {"normal": fit_normal(x)}
+    if (x > 0).all():
+        log_x = np.log(x)
+        models["lognormal"] = fit_lognormal(x, log_x)
+        models["gamma"] = fit_gamma(x, log_x)
+
+    sample = x
+    if len(x) > KS_SAMPLE:
+        sample = np.random.default_rng(rng).choice(x, KS_SAMPLE, replace=False)
+    sample = np.sort(sample)
+    for model in models.values():
+        model.aic = 2 * len(model.params) - 2 * model.loglik
+        model.ks = ks_statistic(model, sample)
+    return models
+
+
+class PlayerModels:
+    """The fits of every (cube type, player) of a data set"""
+
+    def __init__(self, fits=None):
+        # (cube type, player): {distribution name: PlayerModel}
+        self.fits = fits or {}
+
+    def keys(self):
+        return sorted(self.fits)
+
+    def best(self, cube_type, player):
+        """:return: The PlayerModel with the lowest AIC"""
+        return min(self.fits[cube_type, player].values(), key=lambda model: model.aic)
+
+    def sample(self, cube_type, player, size=None, rng=None, dist=None):
+        """Draw solving times from the best model, or the given distribution"""
+        models = self.fits[cube_type, player]
+        model = models[dist] if dist else self.best(cube_type, player)
+        return model.sample(size, rng)
+
+    def to_dict(self):
+        return {"groups": [{"tipo": tipo, "jugador": jugador,
+                            "fits": {name: model.to_dict() for name, model in models.items()}}
+                           for (tipo, jugador), models in sorted(self.fits.items())]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({(group["tipo"], group["jugador"]):
+                    {name: PlayerModel.from_dict(model) for name, model in group["fits"].items()}
+                    for group in data["groups"]})
+
+    def summary(self):
+        lines = [f"{'tipo':<8}{'jugador':>8}{'n':>10}  {'dist':<10}{'aic':>14}{'ks':>9}  params"]
+        for cube_type, player in self.keys():
+            best = self.best(cube_type, player)
+            for name, model in self.fits[cube_type, player].items():
+                params = ", ".join(f"{k}={v:.4g}" for k, v in model.params.items())
+                mark = "*" if model is best else " "
+                lines.append(f"{cube_type:<8}{player:>8}{model.n:>10} {mark}{name:<10}{model.aic:>14.1f}"
+                             f"{model.ks:>9.4f}  {params}")
+        return "\n".join(lines)
+
+
+def _read_groups(path):
+    """:return: {(cube type, player): times array} of a times.csv file or a store directory"""
+    columns = {"tipo": [], "tiempo": [], "jugador": []}
+    if os.path.isdir(path):
+        from store import TimesStore
+
+        store = TimesStore(path)
+        tipos, jugadores = (np.array(store.categories[c]) for c in ("tipo", "jugador"))
+        chunks = ({"tipo": tipos[c["tipo"]], "tiempo": c["tiempo"], "jugador": jugadores[c["jugador"]]}
+                  for c in store.chunks())
+    else:
+        from store import read_csv
+
+        chunks = read_csv(path)
+    for chunk in chunks:
+        for name in columns:
+            columns[name].append(np.asarray(chunk[name]))
+
+    if not columns["tiempo"]:
+        return {}
+    tipo, jugador = (np.concatenate(columns[name]).astype(str) for name in ("tipo", "jugador"))
+    tiempo = np.concatenate(columns["tiempo"]).astype(float)
+    tipos, tipo = np.unique(tipo, return_inverse=True)
+    jugadores, jugador = np.unique(jugador, return_inverse=True)
+    codes = tipo.reshape(-1) * len(jugadores) + jugador.reshape(-1)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.flatnonzero(np.diff(codes[order])) + 1
+    groups = {}
+    for rows in np.split(order, bounds):
+        code = codes[rows[0]]
+        groups[tipos[code // len(jugadores)].item(), jugadores[code % len(jugadores)].item()] = tiempo[rows]
+    return groups
+
+
+def models_path(path):
+    return os.path.join(path, "models.json") if os.path.isdir(path) else path + ".models.json"
+
+
+def _source_key(path):
+    stat = os.stat(os.path.join(path, "meta.json") if os.path.isdir(path) else path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "version": MODELS_VERSION}
+
+
+def fit_models(path=TIMES_CSV, cache=True):
+    """
+    :param path: A times.csv file or a store directory
+    :param cache: Reuse (and write) the fits saved next to path while path is unchanged
+    :return: PlayerModels
+    """
+    path = os.path.abspath(path)
+    key = _source_key(path)
+    if cache and os.path.exists(models_path(path)):
+        with open(models_path(path)) as f:
+            saved = json.load(f)
+        if saved["key"] == key:
+            return PlayerModels.from_dict(saved)
+
+    # a group of fewer than 2 distinct times (e.g. one record) has no spread to fit
+    models = PlayerModels({group: fit(times) for group, times in _read_groups(path).items()
+                           if len(times) >= 2 and times.min() < times.max()})
+    if cache:
+        tmp = models_path(path) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(dict(models.to_dict(), key=key), f, indent=1)
+        os.replace(tmp, models_path(path))
+    return models
+
+
+def check_fit(n=100000, seed=0):
+    """Fit the normal to low-mean, high-spread expert-like times (normal(5, 5) truncated at
+    0, and clipped at 0) and compare the fitted model's mean with the data's.
+    :return: A summary dict; "ok" is whether every mean matches to 1e-6"""
+    rng = as_generator(SimRNG(seed))
+    groups = {"truncated": truncated_normal(5, 5, 0, np.inf, n, rng),
+              "clipped": np.maximum(rng.normal(5, 5, n), 0)}
+    result = {}
+    for name, x in groups.items():
+        model = fit_normal(x)
+        result[name] = {"data_mean": float(x.mean()), "model_mean": model.mean,
+                        "mu": model.params["mu"], "sigma": model.params["sigma"]}
+    result["ok"] = all(math.isclose(group["model_mean"], group["data_mean"], rel_tol=1e-6)
+                       for group in result.values())
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit solving-time models to recorded data")
+    parser.add_argument("path", nargs="?", default=TIMES_CSV, help="times.csv file or store directory")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--check", action="store_true",
+                        help="check that the normal fit keeps the mean of low-mean, high-spread times; "
+                             "exit status 1 if not")
+    args = parser.parse_args(argv)
+    if args.check:
+        result = check_fit()
+        print(json.dumps(result, indent=1))
+        sys.exit(0 if result["ok"] else 1)
+    print(fit_models(args.path, cache=not args.no_cache).summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,259 @@
+"""Base of the ursina games (Rubiks_Cube*.py), driven by a description of the puzzle.
+
+A game subclasses PuzzleGame and only describes its puzzle in class attributes: where the
+cubies are (CUBIES), which layers turn and about which axis (LAYERS), what every move
+turns (MOVES, one TURN_ANGLE turn per layer by default), its click sensors and its move
+buttons. Building the scene, queueing and animating the turns (game_core), shuffling,
+solving and resetting are done here, once for every game.
+
+    class Game(PuzzleGame):
+        NAME = '3x3'
+        CUBIES = grid_positions(range(-1, 2), range(-1, 2), range(-1, 2))
+        LAYERS = {'LEFT': ('x', -1), 'RIGHT': ('x', 1), ...}
+"""
+from ursina import *
+from utils2 import *
+from game_core import *
+from telemetry import telemetry_from_env
+from assets import cubie_model
+
+AXES = 'xyz'
+# notation of the layers, as shown in the move list
+RUBIK_NOTATION = {
+    'LEFT': 'L', 'RIGHT': 'R', 'TOP': 'U', 'BOTTOM': 'D', 'FRONT': 'F', 'BACK': 'B',
+    'MIDDLE_X': 'M', 'MIDDLE_Y': 'E', 'MIDDLE_Z': 'S'
+}
+
+
+def grid_positions(xs, ys, zs):
+    """:return: The positions Vec3(x, y, z) of every x in xs, y in ys and z in zs"""
+    return {Vec3(x, y, z) for x in xs for y in ys for z in zs}
+
+
+def layer_positions(positions, axis, coordinate):
+    """:return: The positions whose axis ('x', 'y' or 'z') coordinate is `coordinate`"""
+    i = AXES.index(axis)
+    return {position for position in positions if position[i] == coordinate}
+
+
+class PuzzleGame:
+    """A cube-like puzzle game; subclasses describe the puzzle (see the module docstring)"""
+    # name of the puzzle in the solve times (write_to_csv)
+    NAME = None
+    # positions of the cubies
+    CUBIES = set()
+    # layer: (axis it turns about, coordinate of its cubies along that axis)
+    LAYERS = {}
+    # move: (layer, angle); None for one move per layer, named like it, of TURN_ANGLE
+    MOVES = None
+    TURN_ANGLE = 90
+    NOTATION = RUBIK_NOTATION
+    # (layer, position, scale) of the invisible boxes that detect clicks on a layer
+    SENSORS = ()
+    # rows of (label, move) buttons, from the top
+    BUTTONS = ()
+    BUTTON_SCALE = (0.30, 0.05)
+    # x of the Solve, Shuffle and Reset buttons, below the move buttons
+    ACTION_BUTTON_X = 0.7
+    SHUFFLE_MOVES = 20
+    SHUFFLE_DELAY = 0.5
+    ANIMATION_TIME = 0.30
+    # longest playback (s) of a solve
+    MAX_SOLVE_TIME = 20
+    # expected length (s) of a frame, to fit a solve into MAX_SOLVE_TIME
+    FRAME_TIME = 1 / 60
+
+    def __init__(self, window_type='onscreen'):
+        # window_type='none' corre el juego sin ventana (ver headless.py)
+        self.ursina_instance = Ursina(window_type=window_type)
+        self.init_game()
+
+    def init_game(self):
+        # window.fullscreen = True
+        self.movimientos = []
+        self.movimientos_show = []
+        camera.world_position = (0, 0, -15)
+        self.model, self.texture = 'custom_cube', 'rubik_texture'
+
+        self.move_text = Text(text='', origin=(0, 15), color=color.black)
+
+        # Cola de movimientos: cada giro empieza cuando termina la animación del anterior
+        self.queue = MoveQueue(on_idle=self.release_animation_trigger)
+        self.queue.attach()
+
+        self.load_game()
+
+        # Telemetría opcional: CUBE_TELEMETRY=<carpeta> (ver telemetry.py)
+        self.telemetry = telemetry_from_env(self)
+
+        # El piso, el cielo y los botones se construyen en los primeros cuadros, después del cubo
+        self.builder = Builder()
+        self.builder.add(self.build_scene())
+        self.builder.attach()
+
+    def load_game(self):
+        self.SIDE_POSITIONS = list(self.CUBIES)
+        self.CUBES = [Entity(model=cubie_model(self.model, self.texture), position=pos) for pos in self.SIDE_POSITIONS]
+        self.PARENT = Entity()
+        self.rotation_axes = {layer: axis for layer, (axis, _) in self.LAYERS.items()}
+        self.layers = {layer: layer_positions(self.CUBIES, axis, coordinate) for layer, (axis, coordinate) in self.LAYERS.items()}
+        self.moves = self.MOVES or {layer: (layer, self.TURN_ANGLE) for layer in self.LAYERS}
+        self.grid = LayerGrid(self.CUBES)
+        self.pivot = TurnPivot(self.PARENT, scene, self.grid)
+        self.queue.pivot = self.pivot
+        self.side_keys = {layer: layer_keys(positions) for layer, positions in self.layers.items()}
+        self.animation_time = self.ANIMATION_TIME
+        self.max_solve_time = self.MAX_SOLVE_TIME
+        self.frame_time = self.FRAME_TIME
+        self.action_trigger = True
+        self.action_mode = True
+        self.message = Text(origin=(0, 19), color=color.black)
+        self.toggle_game_mode()
+        self.create_sensors()
+        # self.random_state(rotations=3) # initial state of the cube, rotations - number of side turns
+
+    def build_scene(self):
+        '''floor, sky, camera controls and buttons, built over the first frames (see Builder)'''
+        Entity(model='quad', scale=60, texture='white_cube', texture_scale=(60, 60), rotation_x=90, y=-5, color=color.light_gray)  # plane
+        yield
+        Entity(model='sphere', scale=100, texture='sky0', double_sided=True)  # sky
+        yield
+        EditorCamera()
+        yield
+
+        # * Botones
+        button_color = color.azure
+        button_spacing = 0.06  # Espacio vertical entre los botones
+
+        # Un botón por movimiento, una fila por capa
+        self.move_buttons = {}
+        for row, buttons in enumerate(self.BUTTONS):
+            for column, (label, move) in enumerate(buttons):
+                self.move_buttons[move] = Button(text=label, color=button_color, scale=self.BUTTON_SCALE,
+                                                 position=(0.7 + 0.07 * column, 0.2 - row * button_spacing),
+                                                 on_click=Func(self.move, move))
+                yield
+
+        # Resolver, barajar y reiniciar, debajo de los movimientos
+        row = len(self.BUTTONS)
+        self.solve_button = Button(text="Solve", color=button_color, scale=(0.30, 0.05), position=(self.ACTION_BUTTON_X, 0.2 - row * button_spacing))
+        self.solve_button.on_click = self.rotate_to_solve
+        yield
+
+        self.shuffle_button = Button(text="Shuffle Cube", color=button_color, scale=(0.30, 0.05), position=(self.ACTION_BUTTON_X, 0.2 - (row + 1) * button_spacing))
+        self.shuffle_button.on_click = self.shuffle_cube
+        yield
+
+        self.reset_button = Button(text="Reset Cube", color=button_color, scale=(0.30, 0.05), position=(self.ACTION_BUTTON_X, 0.2 - (row + 2) * button_spacing))
+        self.reset_button.on_click = self.reset_cube
+
+    def create_sensors(self):
+        '''detectors for each side, for detecting collisions with mouse clicks'''
+        self.sensors = {name: Entity(name=name, position=pos, model='cube', color=color.dark_gray, scale=scale,
+                                     collider='box', visible=False)
+                        for name, pos, scale in self.SENSORS}
+
+    def update_move_text(self):
+        moves_text = ' '.join(self.movimientos_show)
+        self.move_text.text = f"Moves: {moves_text}"
+
+    def to_rubik_notation(self, move):
+        return self.NOTATION.get(move, move)
+
+    def move(self, move):
+        '''queue a move (a key of self.moves) and add it to the move list'''
+        self.play([move], self.to_rubik_notation(move))
+
+    def play(self, moves, shown, delay=0):
+        '''queue moves one after another, `delay` seconds apart, shown as `shown` in the move list'''
+        for move in moves:
+            self.queue.enqueue(self.rotate_side, move, delay=delay)
+        self.movimientos.extend(moves)
+        self.movimientos_show.append(shown)
+        self.update_move_text()
+
+    def shuffle_cube(self):
+        # Barajar el cubo realizando movimientos aleatorios con retraso
+        possible_moves = list(self.moves)
+        for _ in range(self.SHUFFLE_MOVES):
+            random_move = random_choice(possible_moves)
+            self.queue.enqueue(self.rotate_side, random_move, delay=self.SHUFFLE_DELAY - self.animation_time)
+            self.movimientos.append(random_move)
+            self.movimientos_show.append(self.to_rubik_notation(random_move))
+        self.update_move_text()
+
+    def rotate_to_solve(self):
+        reverse_movements = self.movimientos[::-1]
+        mvs = len(reverse_movements)
+        delay_between_moves, Stime = animation_delay("e", mvs)
+        print("dbm", delay_between_moves)
+
+        # Se deshace cada movimiento; los giros seguidos de una misma capa se unen y la reproducción dura a lo sumo max_solve_time
+        turns = [(layer, -angle) for layer, angle in (self.moves[movement] for movement in reverse_movements)]
+        playback = plan_playback(turns, self.max_solve_time, self.animation_time, delay_between_moves, frame_time=self.frame_time)
+        for side_name, angle, duration, delay in playback:
+            self.queue.enqueue(self.turn_layer, side_name, angle, duration, delay=delay)
+        self.movimientos = []
+        self.movimientos_show = []
+        self.move_text.text = f'Solved in {"{:.4f}".format(Stime)} s'
+
+        write_to_csv(self.NAME, mvs, Stime, "e")
+
+    def reset_cube(self):
+        # Detener los movimientos pendientes
+        self.queue.cancel(finish=True)
+
+        # Regresar los cubos a su posición inicial, reutilizando las entidades (el piso, los sensores y los textos se conservan)
+        reset_entities(self.CUBES, self.SIDE_POSITIONS, self.grid)
+
+        self.movimientos = []
+        self.movimientos_show = []
+        self.move_text.text = ""
+        self.action_trigger = True
+        self.action_mode = True
+        self.toggle_game_mode()
+
+    def random_state(self, rotations=3):
+        [self.rotate_side_without_animation(random_choice(list(self.moves))) for i in range(rotations)]
+
+    def rotate_side_without_animation(self, side_name):
+        layer, angle = self.moves[side_name]
+        self.pivot.turn(self.side_keys[layer], self.rotation_axes[layer], angle)
+
+    def toggle_game_mode(self):
+        '''switching view mode or interacting with Rubik's cube'''
+        self.action_mode = not self.action_mode
+        msg = dedent(f"{'ACTION mode ON' if self.action_mode else 'VIEW mode ON'}" f" (to switch - press middle mouse button)").strip()
+        self.message.text = msg
+
+    def release_animation_trigger(self):
+        '''allowing side rotation again, once every queued turn has finished'''
+        self.action_trigger = True
+
+    def rotate_side(self, side_name):
+        layer, angle = self.moves[side_name]
+        self.turn_layer(layer, angle, self.animation_time)
+
+    def rotate_side_2(self, side_name):
+        layer, angle = self.moves[side_name]
+        self.turn_layer(layer, -angle, self.animation_time)
+
+    def turn_layer(self, side_name, angle, duration):
+        self.action_trigger = False
+        rotation_axis = self.rotation_axes[side_name]
+        self.pivot.turn(self.side_keys[side_name], rotation_axis, angle, duration)
+
+    def reparent_to_scene(self):
+        '''finishing the running turn: its cubies go back to the scene, snapped to the grid'''
+        self.pivot.finish()
+
+    def input(self, key):
+        if key in 'mouse1 mouse3' and self.action_mode and self.action_trigger:
+            for hitinfo in mouse.collisions:
+                collider_name = hitinfo.entity.name
+                if (key == 'mouse1' and collider_name in 'LEFT RIGHT FRONT BACK' or
+                        key == 'mouse3' and collider_name in 'TOP BOTTOM'):
+                    self.move(collider_name)
+                    break
+        if key == 'mouse2':
+            self.toggle_game_mode()
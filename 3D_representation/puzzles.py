@@ -0,0 +1,312 @@
+"""Sticker-permutation models for cube-like puzzles of any size.
+
+The state of a puzzle is a flat array with one color per sticker. Every move is a fixed
+permutation of that array, generated once per puzzle shape from the same rotation matrices
+utils.Cube uses and cached, so applying a move is a single NumPy gather over the stickers
+it touches.
+
+Stickers are ordered like utils.Cube.flat_str(): the UP face, then the LEFT, FRONT, RIGHT
+and BACK faces row by row, then the DOWN face. For N = 3 the two models agree on every move.
+"""
+import functools
+import re
+import string
+
+import numpy as np
+
+from utils import ROT_XY_CW, ROT_XY_CC, ROT_XZ_CW, ROT_XZ_CC, ROT_YZ_CW, ROT_YZ_CC
+
+
+def _rot(matrix):
+    return np.array(matrix.vals, dtype=np.int64).reshape(3, 3)
+
+
+# letter: (axis, side of the puzzle, rotation matrix), matching the moves in utils.Cube
+FACE_MOVES = {
+    'R': (0, 1, _rot(ROT_YZ_CW)),
+    'L': (0, -1, _rot(ROT_YZ_CC)),
+    'U': (1, 1, _rot(ROT_XZ_CW)),
+    'D': (1, -1, _rot(ROT_XZ_CC)),
+    'F': (2, 1, _rot(ROT_XY_CW)),
+    'B': (2, -1, _rot(ROT_XY_CC)),
+}
+# letter: (axis, rotation matrix); slices turn every inner layer, rotations the whole puzzle
+SLICE_MOVES = {
+    'M': (0, _rot(ROT_YZ_CC)),
+    'E': (1, _rot(ROT_XZ_CC)),
+    'S': (2, _rot(ROT_XY_CW)),
+}
+CUBE_ROTATIONS = {
+    'X': (0, _rot(ROT_YZ_CW)),
+    'Y': (1, _rot(ROT_XZ_CW)),
+    'Z': (2, _rot(ROT_XY_CW)),
+}
+
+# [layer]letter[w][i|'|2]: "R", "Ri", "R'", "R2", "2R" (second layer), "Rw" / "3Rw" (wide)
+MOVE_RE = re.compile(r"^(\d*)([LRUDFBMESXYZ])(w?)(i|'|2)?$")
+
+# default sticker colors, one per face in serialization order
+FACE_COLORS = "ULFRBD"
+
+
+class _Geometry:
+    """Sticker positions and normals of a box-shaped puzzle, in serialization order.
+
+    Coordinates are doubled so they stay integers for even sizes: a side of n cubies spans
+    -(n-1), -(n-3), ..., n-1.
+    """
+
+    def __init__(self, shape):
+        self.shape = shape
+        nx, ny, nz = shape
+        xs, ys, zs = (list(range(-(n - 1), n, 2)) for n in shape)
+        x0, y0, z0 = xs[-1], ys[-1], zs[-1]
+
+        up = [((x, y0, z), (0, 1, 0)) for z in zs for x in xs]
+        down = [((x, -y0, z), (0, -1, 0)) for z in reversed(zs) for x in xs]
+        rows = []
+        for y in reversed(ys):
+            rows += [((-x0, y, z), (-1, 0, 0)) for z in zs]
+            rows += [((x, y, z0), (0, 0, 1)) for x in xs]
+            rows += [((x0, y, z), (1, 0, 0)) for z in reversed(zs)]
+            rows += [((x, y, -z0), (0, 0, -1)) for x in reversed(xs)]
+        stickers = up + rows + down
+
+        self.size = len(stickers)
+        self.positions = np.array([p for p, _ in stickers], dtype=np.int64)
+        self.normals = np.array([n for _, n in stickers], dtype=np.int64)
+        self.index = {s: i for i, s in enumerate(stickers)}
+
+        # sticker indices of every face, in FACE_COLORS order
+        self.faces = []
+        for normal in ((0, 1, 0), (-1, 0, 0), (0, 0, 1), (1, 0, 0), (0, 0, -1), (0, -1, 0)):
+            self.faces.append(np.flatnonzero((self.normals == normal).all(axis=1)))
+
+        # per face: (width, rows) used by __str__
+        self.face_dims = [(nx, nz), (nz, ny), (nx, ny), (nz, ny), (nx, ny), (nx, nz)]
+
+    def layer_coords(self, axis, side, layer):
+        """Coordinate of the layer-th layer (1 = outer face) counted from the given side"""
+        n = self.shape[axis]
+        if not 1 <= layer <= n:
+            raise ValueError(f"Layer {layer} does not exist on a puzzle {n} wide on axis {axis}")
+        return side * (n - 1) - side * 2 * (layer - 1)
+
+    def permutation(self, axis, coords, matrix, turns):
+        """
+        :return: (dst, src) index arrays such that new_state[dst] = old_state[src] turns
+            the given layers `turns` quarter turns with `matrix`
+        """
+        src = np.flatnonzero(np.isin(self.positions[:, axis], list(coords)))
+        pos, nrm = self.positions[src], self.normals[src]
+        for _ in range(turns):
+            pos, nrm = pos @ matrix.T, nrm @ matrix.T
+        try:
+            dst = np.array([self.index[(tuple(p), tuple(n))] for p, n in zip(pos.tolist(), nrm.tolist())],
+                           dtype=np.intp)
+        except KeyError:
+            raise ValueError(f"Turn does not fit a puzzle of shape {self.shape}") from None
+        return dst, src
+
+
+@functools.lru_cache(maxsize=None)
+def geometry(shape):
+    return _Geometry(tuple(shape))
+
+
+@functools.lru_cache(maxsize=None)
+def compile_move(shape, name):
+    """
+    :param shape: (nx, ny, nz) cubies along each axis
+    :param name: A single move, e.g. "R", "Ui", "F2", "2R", "Rw", "3Lwi", "M", "X"
+    :return: (dst, src) read-only index arrays, see _Geometry.permutation
+    """
+    match = MOVE_RE.match(name)
+    if not match:
+        raise ValueError(f"Unknown move: {name!r}")
+    prefix, letter, wide, suffix = match.groups()
+    turns = {None: 1, 'i': 3, "'": 3, '2': 2}[suffix]
+    geo = geometry(shape)
+
+    if letter in FACE_MOVES:
+        axis, side, matrix = FACE_MOVES[letter]
+        depth = int(prefix) if prefix else (2 if wide else 1)
+        layers = range(1, depth + 1) if wide else [depth]
+        coords = [geo.layer_coords(axis, side, layer) for layer in layers]
+    elif prefix or wide:
+        raise ValueError(f"Only face moves take a layer prefix or 'w': {name!r}")
+    elif letter in SLICE_MOVES:
+        axis, matrix = SLICE_MOVES[letter]
+        n = shape[axis]
+        if n < 3:
+            raise ValueError(f"{name!r} needs inner layers, the puzzle is {n} wide")
+        coords = range(-(n - 3), n - 2, 2)
+    else:
+        axis, matrix = CUBE_ROTATIONS[letter]
+        coords = range(-(shape[axis] - 1), shape[axis], 2)
+
+    dst, src = geo.permutation(axis, coords, matrix, turns)
+    dst.flags.writeable = False
+    src.flags.writeable = False
+    return dst, src
+
+
+class StickerPuzzle:
+    """A box-shaped twisty puzzle stored as one color per sticker.
+
+    Subclasses set SHAPE; colors are single characters, as in utils.Cube.
+    """
+
+    SHAPE = None
+    # if set, the only move names move()/sequence() accept
+    MOVES = None
+    # move name -> the move it stands for, e.g. {'R': 'R2'} for puzzles that only half turn
+    ALIASES = {}
+
+    def __init__(self, state=None, shape=None):
+        """
+        :param state: None for the solved puzzle, a sticker string laid out like
+            utils.Cube (whitespace is ignored) or another puzzle of the same shape to copy
+        """
+        self.shape = tuple(shape or self.SHAPE)
+        self._geo = geometry(self.shape)
+
+        if isinstance(state, StickerPuzzle):
+            if state.shape != self.shape:
+                raise ValueError(f"Cannot copy a {state.shape} puzzle into a {self.shape} one")
+            self.state = state.state.copy()
+            return
+        if state is None:
+            self.state = np.empty(self._geo.size, dtype=np.uint8)
+            for face, color in zip(self._geo.faces, FACE_COLORS):
+                self.state[face] = ord(color)
+            return
+
+        state = "".join(x for x in state if x not in string.whitespace)
+        if len(state) != self._geo.size:
+            raise ValueError(f"Expected {self._geo.size} stickers, got {len(state)}")
+        self.state = np.frombuffer(state.encode('ascii'), dtype=np.uint8).copy()
+
+    def copy(self):
+        return type(self)(self)
+
+    def _compile(self, name):
+        if self.MOVES is not None and name not in self.MOVES:
+            raise ValueError(f"{type(self).__name__} has no move {name!r}")
+        return compile_move(self.shape, self.ALIASES.get(name, name))
+
+    def move(self, name):
+        dst, src = self._compile(name)
+        self.state[dst] = self.state[src]
+
+    def sequence(self, move_str):
+        """
+        :param move_str: A string containing notated moves separated by spaces: "L Ri U M Ui B M"
+        """
+        moves = [self._compile(name) for name in move_str.split()]
+        state = self.state
+        for dst, src in moves:
+            state[dst] = state[src]
+
+    def compile(self, move_str):
+        """
+        :return: A permutation p of the sticker indices such that applying move_str is
+            state = state[p]
+        """
+        perm = np.arange(self._geo.size)
+        for name in move_str.split():
+            dst, src = self._compile(name)
+            step = np.arange(self._geo.size)
+            step[dst] = src
+            perm = perm[step]
+        return perm
+
+    def apply(self, perm):
+        """Apply a permutation returned by compile()"""
+        self.state = self.state[perm]
+
+    def __getattr__(self, name):
+        # cube.R(), cube.Ui() ... like utils.Cube
+        if MOVE_RE.match(name):
+            return functools.partial(self.move, name)
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def is_solved(self):
+        state = self.state
+        return all((state[face] == state[face[0]]).all() for face in self._geo.faces)
+
+    def flat_str(self):
+        return self.state.tobytes().decode('ascii')
+
+    def __eq__(self, other):
+        return (isinstance(other, StickerPuzzle) and self.shape == other.shape
+                and np.array_equal(self.state, other.state))
+
+    def __ne__(self, other):
+        return not (self == other)
+
+    def __str__(self):
+        flat = self.flat_str()
+        (up_w, up_h), (left_w, rows) = self._geo.face_dims[0], self._geo.face_dims[1]
+        row_w = 2 * (left_w + up_w)
+        indent = " " * (left_w + 1)
+
+        lines = [indent + flat[r * up_w:(r + 1) * up_w] for r in range(up_h)]
+        start = up_w * up_h
+        for r in range(rows):
+            row = flat[start + r * row_w:start + (r + 1) * row_w]
+            cuts = [0, left_w, left_w + up_w, 2 * left_w + up_w, row_w]
+            lines.append(" ".join(row[a:b] for a, b in zip(cuts, cuts[1:])))
+        start += rows * row_w
+        lines += [indent + flat[start + r * up_w:start + (r + 1) * up_w] for r in range(up_h)]
+        return "\n".join(lines)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.flat_str()!r})"
+
+
+class CubeN(StickerPuzzle):
+    """An NxNxN cube (N >= 2).
+
+    Besides the utils.Cube moves it understands inner layers ("2R"), wide turns ("Rw",
+    "3Rw"), half turns ("R2") and "'" as an alternative to the "i" suffix. M, E and S turn
+    every inner layer.
+    """
+
+    def __init__(self, n=3, state=None):
+        if isinstance(n, CubeN):
+            n, state = n.shape[0], n
+        if n < 2:
+            raise ValueError(f"A cube needs at least 2 layers, got {n}")
+        super().__init__(state, shape=(n, n, n))
+
+    @property
+    def n(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return f"CubeN({self.n}, {self.flat_str()!r})"
+
+
+class Cube2x2(CubeN):
+    """The puzzle of Rubiks_Cube2x2.py: quarter turns of the six faces"""
+
+    MOVES = frozenset(m + s for m in "LRUDFB" for s in ("", "i"))
+
+    def __init__(self, state=None):
+        super().__init__(2, state)
+
+    def __repr__(self):
+        return f"Cube2x2({self.flat_str()!r})"
+
+
+class Floppy(StickerPuzzle):
+    """The 3x3x1 puzzle of Rubiks_Cube_Floppy.py.
+
+    Its four side layers only turn 180 degrees, so L, R, F and B (and their 'i' forms,
+    which are the same turn) are half turns.
+    """
+
+    SHAPE = (3, 1, 3)
+    MOVES = frozenset(m + s for m in "LRFB" for s in ("", "i"))
+    ALIASES = {m + s: m + "2" for m in "LRFB" for s in ("", "i")}
@@ -0,0 +1,224 @@
+"""Monte Carlo simulation of solve sessions.
+
+Every sample scrambles a puzzle the way its game's Shuffle button does, solves it to get
+the number of moves, and draws the player's solving time for that many moves from the
+utils2 time model. Work is split into tasks that run on a process pool, each with its own
+stream spawned from one SimRNG, and the results are reduced into per (cube type, player)
+distributions. The same seed, n and task size reproduce a run exactly, whatever the
+number of workers.
+
+    python simulation.py -n 10000 --seed 1
+    python simulation.py --check          # the time sampler with bounds far in the tail
+"""
+import argparse
+import collections
+import concurrent.futures
+import functools
+import json
+import os
+import sys
+
+import numpy as np
+
+from puzzles import Floppy
+from utils import Cube, Solver, optimize_moves
+from utils2 import CUBE_TYPES, PLAYER_TYPES, SimRNG, as_generator, sample_delays, truncated_normal
+
+SOLVED_CUBE_STR = "OOOOOOOOOYYYWWWGGGBBBYYYWWWGGGBBBYYYWWWGGGBBBRRRRRRRRR"
+
+# cube type: (moves the game's shuffle picks from, number of moves), in utils notation
+SCRAMBLES = {
+    "3x3": (["L", "R", "U", "D", "F", "B", "M", "E", "S"], 20),
+    "3x3V2": ([m + s for m in "LRUDFBMES" for s in ("", "i")], 20),
+    "2x2": (["L", "R", "U", "D", "F", "B"], 15),
+    "floppy": (["L", "R", "F", "B"], 5),
+}
+
+
+def scramble(cube_type, rng=None):
+    moves, length = SCRAMBLES[cube_type]
+    return [moves[i] for i in as_generator(rng).integers(len(moves), size=length)]
+
+
+def solve_3x3(moves):
+    """:return: Moves utils.Solver needs for the scramble, after optimize_moves()"""
+    cube = Cube(SOLVED_CUBE_STR)
+    cube.sequence(" ".join(moves))
+    solver = Solver(cube)
+    solver.solve()
+    assert cube.is_solved()
+    return len(optimize_moves(solver.moves))
+
+
+def solve_undo(moves):
+    """:return: Moves of the games' own solve, which plays the scramble back in reverse
+    (adjacent moves that cancel are dropped)"""
+    inverse = [m[:-1] if m.endswith("i") else m + "i" for m in reversed(moves)]
+    return len(optimize_moves(inverse))
+
+
+@functools.lru_cache(maxsize=None)
+def _floppy_distances():
+    """Breadth-first search over the 192 Floppy positions from the solved one"""
+    start = Floppy()
+    distances = {start.flat_str(): 0}
+    queue = collections.deque([start])
+    while queue:
+        puzzle = queue.popleft()
+        for move in "LRFB":
+            nxt = puzzle.copy()
+            nxt.move(move)
+            key = nxt.flat_str()
+            if key not in distances:
+                distances[key] = distances[puzzle.flat_str()] + 1
+                queue.append(nxt)
+    return distances
+
+
+def solve_floppy(moves):
+    """:return: Length of an optimal solution"""
+    puzzle = Floppy()
+    puzzle.sequence(" ".join(moves))
+    return _floppy_distances()[puzzle.flat_str()]
+
+
+SOLVERS = {
+    "3x3": solve_3x3,
+    "3x3V2": solve_3x3,
+    "2x2": solve_undo,
+    "floppy": solve_floppy,
+}
+
+
+def simulate_task(cube_type, player, n, rng, models=None):
+    """Run n samples with the SimRNG rng. Times come from the player_models.PlayerModels
+    models if given, else from utils2.sample_delays. :return: (moves, times) arrays"""
+    rng = as_generator(rng)
+    solve = SOLVERS[cube_type]
+    moves = np.array([solve(scramble(cube_type, rng)) for _ in range(n)], dtype=np.int64)
+    if models is not None:
+        times = models.sample(cube_type, player, n, rng=rng)
+    else:
+        _, times = sample_delays(player, moves, rng=rng)
+    return moves, times
+
+
+def simulate(n, seed=None, cube_types=CUBE_TYPES, players=PLAYER_TYPES, workers=None, task_size=500,
+             rng=None, models=None):
+    """
+    :param n: Samples per (cube type, player)
+    :param rng: The SimRNG to spawn task streams from; SimRNG(seed) by default
+    :param models: Fitted player_models.PlayerModels to draw the times from
+    :return: {(cube type, player): {"movimientos": array, "tiempo": array}}
+    """
+    if rng is None:
+        rng = SimRNG(seed)
+    tasks = []
+    for cube_type in cube_types:
+        for player in players:
+            for start in range(0, n, task_size):
+                tasks.append((cube_type, player, min(task_size, n - start)))
+    streams = rng.spawn(len(tasks))
+
+    parts = collections.defaultdict(list)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(simulate_task, cube_type, player, size, stream, models)
+                   for (cube_type, player, size), stream in zip(tasks, streams)]
+        for (cube_type, player, _), future in zip(tasks, futures):
+            parts[cube_type, player].append(future.result())
+
+    return {key: {"movimientos": np.concatenate([m for m, _ in chunks]),
+                  "tiempo": np.concatenate([t for _, t in chunks])}
+            for key, chunks in parts.items()}
+
+
+def summary(results):
+    lines = [f"{'tipo':<8}{'jugador':>8}{'n':>9}{'moves':>9}{'tiempo':>10}{'p50':>10}{'p90':>10}"]
+    for (cube_type, player), data in sorted(results.items()):
+        t = data["tiempo"]
+        lines.append(f"{cube_type:<8}{player:>8}{len(t):>9}{data['movimientos'].mean():>9.1f}"
+                     f"{t.mean():>10.1f}{np.percentile(t, 50):>10.1f}{np.percentile(t, 90):>10.1f}")
+    return "\n".join(lines)
+
+
+def to_store(results, store, run=None):
+    """Append the results to a store.TimesStore, logging run (e.g. the rng state) with them"""
+    rows = 0
+    for (cube_type, player), data in results.items():
+        size = len(data["tiempo"])
+        store.append(np.full(size, cube_type), data["movimientos"], data["tiempo"], np.full(size, player))
+        rows += size
+    if run is not None:
+        store.log_run(dict(run, rows=rows))
+
+
+def to_stats(results, stats=None):
+    """Add the results to a stats.SolveStats (a new one by default). :return: The SolveStats"""
+    from stats import SolveStats
+
+    stats = SolveStats() if stats is None else stats
+    for (cube_type, player), data in results.items():
+        stats.update(cube_type, data["movimientos"], data["tiempo"], player)
+    return stats
+
+
+def check_sampler(n=100000, seed=0):
+    """Draw times whose bounds lie far in a tail of their normal, where its CDF underflows:
+    an average player's time for a million moves, and a standard normal beyond 50.
+    :return: A summary dict; "ok" is whether every draw lies within its bounds and, as the
+    density falls off away from the mean, within `near` of the bound closest to it"""
+    rng = SimRNG(seed)
+    _, average = sample_delays("a", np.full(n, 1e6), rng=rng)
+    draws = {
+        # (draws, low, high, near)
+        "average_1e6_moves": (average, 0.30 * 1e6, 30 * 1e6, 10.0),
+        "upper_tail": (truncated_normal(0, 1, 50, 60, n, rng), 50, 60, 0.5),
+        "lower_tail": (truncated_normal(0, 1, -60, -50, n, rng), -60, -50, 0.5),
+    }
+    result = {}
+    for name, (x, low, high, near) in draws.items():
+        closest = low if abs(low) < abs(high) else high
+        result[name] = {"low": low, "high": high, "min": float(x.min()), "max": float(x.max()),
+                        "ok": bool(low <= x.min() and x.max() <= high and np.abs(x - closest).max() <= near)}
+    result["ok"] = all(group["ok"] for group in result.values())
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo simulation of solve sessions")
+    parser.add_argument("-n", type=int, default=1000, help="samples per (cube type, player)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--task-size", type=int, default=500, help="samples per task (part of the seed)")
+    parser.add_argument("--store", help="append the samples to this store directory")
+    parser.add_argument("--stats", help="merge a summary of the samples into this JSON file")
+    parser.add_argument("--models", help="draw the times from models fitted to this times.csv or store")
+    parser.add_argument("--check", action="store_true",
+                        help="check the time sampler with bounds far in the tail; exit status 1 if it fails")
+    args = parser.parse_args(argv)
+    if args.check:
+        result = check_sampler()
+        print(json.dumps(result, indent=1))
+        sys.exit(0 if result["ok"] else 1)
+
+    models = None
+    if args.models:
+        from player_models import fit_models
+        models = fit_models(args.models)
+    rng = SimRNG(args.seed)
+    results = simulate(args.n, workers=args.workers, task_size=args.task_size, rng=rng, models=models)
+    print(summary(results))
+    print(f"seed: {rng.seed}")
+    if args.store:
+        from store import TimesStore
+        to_store(results, TimesStore(args.store),
+                 run={"source": "simulation", "rng": rng.state(), "n": args.n, "task_size": args.task_size,
+                      "models": args.models})
+    if args.stats:
+        from stats import SolveStats
+        stats = SolveStats.load(args.stats) if os.path.exists(args.stats) else None
+        to_stats(results, stats).save(args.stats)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,293 @@
+"""Streaming statistics for solve-time records.
+
+SolveStats keeps, per (cube type, player), a running count/mean/variance/min/max, a
+fixed-bin histogram and a quantile sketch of the moves and times. Records can be added
+one at a time or in NumPy batches, summaries from different workers merge exactly, and
+everything round-trips through JSON, so reports read a summary of constant size instead
+of the raw data.
+
+    stats = SolveStats()
+    stats.update(tipo, movimientos, tiempo, jugador)     # arrays or scalars
+    stats.merge(other_worker_stats)
+    stats.save("times_stats.json")
+    stats[("3x3", "e")]["tiempo"].quantile(0.9)
+"""
+import json
+import math
+
+import numpy as np
+
+# default histogram bins per column
+BINS = {
+    "movimientos": np.arange(0, 401, 2),
+    "tiempo": np.arange(0, 1801, 5),
+}
+
+
+class RunningStats:
+    """Count, mean, variance, min and max, updated in batches (Chan et al.)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        if values.size:
+            other = RunningStats()
+            other.count = values.size
+            other.mean = float(values.mean())
+            other.m2 = float(((values - other.mean) ** 2).sum())
+            other.min, other.max = float(values.min()), float(values.max())
+            self.merge(other)
+
+    def merge(self, other):
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min, self.max = min(self.min, other.min), max(self.max, other.max)
+
+    @property
+    def variance(self):
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+    def to_dict(self):
+        return {"count": self.count, "mean": self.mean, "m2": self.m2,
+                "min": self.min if self.count else None, "max": self.max if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count, stats.mean, stats.m2 = data["count"], data["mean"], data["m2"]
+        if stats.count:
+            stats.min, stats.max = data["min"], data["max"]
+        return stats
+
+
+class Histogram:
+    """Counts over fixed bin edges, plus the values that fell below or above them"""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=float)
+        self.counts = np.zeros(len(self.edges) - 1, dtype=np.int64)
+        self.under = 0
+        self.over = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        self.counts += np.histogram(values, self.edges)[0]
+        self.under += int((values < self.edges[0]).sum())
+        self.over += int((values > self.edges[-1]).sum())
+
+    def merge(self, other):
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Cannot merge histograms with different bins")
+        self.counts += other.counts
+        self.under += other.under
+        self.over += other.over
+
+    def to_dict(self):
+        return {"edges": self.edges.tolist(), "counts": self.counts.tolist(),
+                "under": self.under, "over": self.over}
+
+    @classmethod
+    def from_dict(cls, data):
+        hist = cls(data["edges"])
+        hist.counts[:] = data["counts"]
+        hist.under, hist.over = data["under"], data["over"]
+        return hist
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch with relative accuracy alpha (DDSketch).
+
+    Positive values go to logarithmic buckets, so any quantile is returned within a
+    factor (1 +- alpha) of the true one; values <= 0 are counted together as zero.
+    """
+
+    def __init__(self, alpha=0.01):
+        self.alpha = alpha
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=float).ravel()
+        positive = values[values > 0]
+        self.zero_count += values.size - positive.size
+        self.count += values.size
+        if positive.size:
+            keys, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64),
+                                     return_counts=True)
+            for key, count in zip(keys.tolist(), counts.tolist()):
+                self.buckets[key] = self.buckets.get(key, 0) + count
+
+    def merge(self, other):
+        if self.alpha != other.alpha:
+            raise ValueError("Cannot merge sketches with different accuracy")
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+
+    def quantile(self, q):
+        if not self.count:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+    def to_dict(self):
+        return {"alpha": self.alpha, "zero_count": self.zero_count, "count": self.count,
+                "buckets": {str(k): v for k, v in self.buckets.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["alpha"])
+        sketch.zero_count, sketch.count = data["zero_count"], data["count"]
+        sketch.buckets = {int(k): v for k, v in data["buckets"].items()}
+        return sketch
+
+
+class ColumnSummary:
+    """RunningStats, Histogram and QuantileSketch of one column"""
+
+    def __init__(self, edges, alpha=0.01):
+        self.stats = RunningStats()
+        self.histogram = Histogram(edges)
+        self.sketch = QuantileSketch(alpha)
+
+    def update(self, values):
+        self.stats.update(values)
+        self.histogram.update(values)
+        self.sketch.update(values)
+
+    def merge(self, other):
+        self.stats.merge(other.stats)
+        self.histogram.merge(other.histogram)
+        self.sketch.merge(other.sketch)
+
+    def quantile(self, q):
+        return self.sketch.quantile(q)
+
+    def __getattr__(self, name):
+        # count, mean, std, min, max ...
+        if name == "stats":
+            raise AttributeError(name)
+        return getattr(self.stats, name)
+
+    def to_dict(self):
+        return {"stats": self.stats.to_dict(), "histogram": self.histogram.to_dict(),
+                "sketch": self.sketch.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls.__new__(cls)
+        summary.stats = RunningStats.from_dict(data["stats"])
+        summary.histogram = Histogram.from_dict(data["histogram"])
+        summary.sketch = QuantileSketch.from_dict(data["sketch"])
+        return summary
+
+
+class SolveStats:
+    """Per (cube type, player) ColumnSummary of "movimientos" and "tiempo" """
+
+    COLUMNS = ("movimientos", "tiempo")
+
+    def __init__(self, bins=None, alpha=0.01):
+        self.bins = dict(BINS, **(bins or {}))
+        self.alpha = alpha
+        self.groups = {}
+
+    def _group(self, key):
+        if key not in self.groups:
+            self.groups[key] = {column: ColumnSummary(self.bins[column], self.alpha)
+                                for column in self.COLUMNS}
+        return self.groups[key]
+
+    def update(self, tipo, movimientos, tiempo, jugador):
+        """Add records; every argument is a scalar or an array of the same length"""
+        tipo, jugador = np.atleast_1d(np.asarray(tipo, dtype=str)), np.atleast_1d(np.asarray(jugador, dtype=str))
+        movimientos, tiempo = np.atleast_1d(movimientos), np.atleast_1d(tiempo)
+        tipo, jugador = np.broadcast_to(tipo, movimientos.shape), np.broadcast_to(jugador, movimientos.shape)
+
+        tipos, tipo = np.unique(tipo, return_inverse=True)
+        jugadores, jugador = np.unique(jugador, return_inverse=True)
+        codes = tipo.reshape(-1) * len(jugadores) + jugador.reshape(-1)
+        for code in np.unique(codes).tolist():
+            rows = codes == code
+            group = self._group((tipos[code // len(jugadores)].item(), jugadores[code % len(jugadores)].item()))
+            group["movimientos"].update(movimientos[rows])
+            group["tiempo"].update(tiempo[rows])
+
+    def add(self, tipo, movimientos, tiempo, jugador):
+        """Add a single record"""
+        group = self._group((tipo, jugador))
+        group["movimientos"].update([movimientos])
+        group["tiempo"].update([tiempo])
+
+    def merge(self, other):
+        for key, columns in other.groups.items():
+            group = self._group(key)
+            for column in self.COLUMNS:
+                group[column].merge(columns[column])
+        return self
+
+    def __getitem__(self, key):
+        return self.groups[key]
+
+    def keys(self):
+        return sorted(self.groups)
+
+    def to_dict(self):
+        return {"alpha": self.alpha,
+                "bins": {column: np.asarray(edges).tolist() for column, edges in self.bins.items()},
+                "groups": [{"tipo": tipo, "jugador": jugador,
+                            **{column: summary.to_dict() for column, summary in columns.items()}}
+                           for (tipo, jugador), columns in sorted(self.groups.items())]}
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls(bins={column: np.asarray(edges) for column, edges in data["bins"].items()},
+                    alpha=data["alpha"])
+        for group in data["groups"]:
+            stats.groups[group["tipo"], group["jugador"]] = {
+                column: ColumnSummary.from_dict(group[column]) for column in cls.COLUMNS}
+        return stats
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def from_store(store, stats=None):
+    """Summarize a store.TimesStore one chunk at a time. :return: The SolveStats"""
+    stats = SolveStats() if stats is None else stats
+    tipos, jugadores = (np.array(store.categories[column]) for column in ("tipo", "jugador"))
+    for chunk in store.chunks():
+        stats.update(tipos[chunk["tipo"]], chunk["movimientos"], chunk["tiempo"], jugadores[chunk["jugador"]])
+    return stats
@@ -0,0 +1,175 @@
+"""Columnar binary storage for solve-time records.
+
+A store is a directory of .npy chunks, one file per column per chunk, plus meta.json:
+
+    times_store/
+        meta.json                  categories of tipo/jugador and the list of chunks
+        00000.tipo.npy             uint8 codes into the tipo categories
+        00000.movimientos.npy      int32
+        00000.tiempo.npy           float64
+        00000.jugador.npy          uint8 codes into the jugador categories
+
+Appending writes a new chunk, loading memory-maps the chunks, and compact() merges them
+into one so a load maps a single file per column.
+
+    store = TimesStore("times_store")
+    import_csv("../Graphs/times.csv", store)
+    cols = store.load()          # {"tipo": memmap, "movimientos": memmap, ...}
+"""
+import json
+import os
+
+import numpy as np
+
+from utils2 import CUBE_TYPES, PLAYER_TYPES
+
+COLUMNS = {
+    "tipo": np.uint8,
+    "movimientos": np.int32,
+    "tiempo": np.float64,
+    "jugador": np.uint8,
+}
+CATEGORICAL = ("tipo", "jugador")
+
+
+class TimesStore:
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self._meta_path = os.path.join(self.path, "meta.json")
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                self.meta = json.load(f)
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            self.meta = {
+                "columns": {name: np.dtype(dtype).str for name, dtype in COLUMNS.items()},
+                "categories": {"tipo": list(CUBE_TYPES), "jugador": list(PLAYER_TYPES)},
+                "chunks": [],
+            }
+            self._save_meta()
+
+    def __len__(self):
+        return sum(chunk["rows"] for chunk in self.meta["chunks"])
+
+    @property
+    def categories(self):
+        return self.meta["categories"]
+
+    def _save_meta(self):
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.meta, f, indent=1)
+        os.replace(tmp, self._meta_path)
+
+    def _file(self, chunk, column):
+        return os.path.join(self.path, f"{chunk}.{column}.npy")
+
+    def encode(self, column, values):
+        """:return: The codes of values (strings) in the column's categories, adding new ones"""
+        categories = self.categories[column]
+        uniques, inverse = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+        for value in uniques.tolist():
+            if value not in categories:
+                categories.append(value)
+        lookup = np.array([categories.index(value) for value in uniques.tolist()], dtype=COLUMNS[column])
+        return lookup[inverse.reshape(-1)]
+
+    def append(self, tipo, movimientos, tiempo, jugador):
+        """Append records given with tipo/jugador as strings"""
+        self.append_codes(self.encode("tipo", tipo), movimientos, tiempo, self.encode("jugador", jugador))
+
+    def append_codes(self, tipo, movimientos, tiempo, jugador):
+        """Append records given with tipo/jugador as codes into the store's categories"""
+        columns = {"tipo": tipo, "movimientos": movimientos, "tiempo": tiempo, "jugador": jugador}
+        rows = {len(values) for values in columns.values()}
+        if len(rows) != 1:
+            raise ValueError(f"Columns have different lengths: {sorted(rows)}")
+        rows = rows.pop()
+        if not rows:
+            return
+
+        chunk = "%05d" % (int(self.meta["chunks"][-1]["name"]) + 1 if self.meta["chunks"] else 0)
+        for name, dtype in COLUMNS.items():
+            np.save(self._file(chunk, name), np.asarray(columns[name], dtype=dtype))
+        self.meta["chunks"].append({"name": chunk, "rows": rows})
+        self._save_meta()
+
+    def log_run(self, info):
+        """Record how a batch of rows was produced (seed, parameters...) in meta.json"""
+        self.meta.setdefault("runs", []).append(info)
+        self._save_meta()
+
+    def chunks(self):
+        """:return: A list with one {column: memmap} dict per chunk"""
+        return [{name: np.load(self._file(chunk["name"], name), mmap_mode="r") for name in COLUMNS}
+                for chunk in self.meta["chunks"]]
+
+    def load(self):
+        """:return: {column: array}, memory-mapped when the store has a single chunk"""
+        chunks = self.chunks()
+        if not chunks:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        if len(chunks) == 1:
+            return chunks[0]
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in COLUMNS}
+
+    def compact(self):
+        """Merge all chunks into one, copying a chunk at a time"""
+        old = self.meta["chunks"]
+        if len(old) <= 1:
+            return
+        rows = len(self)
+        name = "%05d" % (int(old[-1]["name"]) + 1)
+        for column, dtype in COLUMNS.items():
+            out = np.lib.format.open_memmap(self._file(name, column), mode="w+", dtype=dtype, shape=(rows,))
+            start = 0
+            for chunk in old:
+                values = np.load(self._file(chunk["name"], column), mmap_mode="r")
+                out[start:start + len(values)] = values
+                start += len(values)
+            out.flush()
+            del out
+        self.meta["chunks"] = [{"name": name, "rows": rows}]
+        self._save_meta()
+        for chunk in old:
+            for column in COLUMNS:
+                os.remove(self._file(chunk["name"], column))
+
+    def to_pandas(self):
+        """:return: A DataFrame with tipo and jugador as pandas Categoricals"""
+        import pandas as pd
+
+        cols = self.load()
+        data = {name: np.asarray(values) for name, values in cols.items()}
+        for name in CATEGORICAL:
+            data[name] = pd.Categorical.from_codes(data[name], self.categories[name])
+        return pd.DataFrame(data)
+
+
+def read_csv(csv_path, chunksize=1000000):
+    """Read a times.csv file (values separated by ", ", with or without the
+    "TIpo","Movimientos","Tiempo","Jugador" header) a chunk at a time.
+    :return: An iterator of {column: array} dicts, with tipo/jugador as strings"""
+    import pandas as pd
+
+    with open(csv_path) as f:
+        first = f.readline().split(",")
+    has_header = len(first) > 1 and not first[1].strip().lstrip("-").isdigit()
+
+    reader = pd.read_csv(csv_path, skipinitialspace=True, chunksize=chunksize,
+                         names=list(COLUMNS), header=0 if has_header else None,
+                         dtype={"tipo": str, "movimientos": np.int64, "tiempo": np.float64, "jugador": str})
+    for df in reader:
+        yield {"tipo": df["tipo"].str.strip().to_numpy(), "movimientos": df["movimientos"].to_numpy(),
+               "tiempo": df["tiempo"].to_numpy(), "jugador": df["jugador"].str.strip().to_numpy()}
+
+
+def import_csv(csv_path, store, chunksize=1000000):
+    """Append a times.csv file (see read_csv) to a TimesStore or a store path.
+    :return: The store"""
+    if not isinstance(store, TimesStore):
+        store = TimesStore(store)
+    for cols in read_csv(csv_path, chunksize):
+        store.append(cols["tipo"], cols["movimientos"], cols["tiempo"], cols["jugador"])
+    return store
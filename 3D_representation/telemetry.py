@@ -0,0 +1,166 @@
+"""Opt-in frame and move telemetry for the ursina games.
+
+Start a game with CUBE_TELEMETRY set (to a directory, or to 1 for ./telemetry) and every
+frame records its length, the time spent in ursina's update (the game logic and the
+animations), the running animations, the entities, the moves waiting in the MoveQueue and
+the time spent in each of TIMED_METHODS. Every finished move records its latency, from
+being queued (a click or a button) to the end of its animation. The records are kept in
+ring buffers of the last CAPACITY frames and moves, written every EXPORT_EVERY seconds and
+at exit to frames.csv, moves.csv and summary.json, and summed up in an on-screen overlay.
+
+    CUBE_TELEMETRY=/tmp/telemetry python Rubiks_Cube3x3.py
+    CUBE_TELEMETRY=/tmp/telemetry python headless.py 3x3 --sessions 5
+"""
+import atexit
+import collections
+import csv
+import functools
+import json
+import os
+import time
+
+import numpy as np
+
+ENV_VAR = "CUBE_TELEMETRY"
+DEFAULT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "telemetry")
+FRAME_FIELDS = ("frame", "t", "dt_ms", "update_ms", "animations", "entities", "pending")
+MOVE_FIELDS = ("move", "queued_at", "wait_ms", "latency_ms")
+# methods of the Game whose time is added up per frame, as <name>_ms columns
+TIMED_METHODS = ("rotate_side", "rotate_side_2", "turn_layer", "reparent_to_scene", "update_move_text")
+# frames and moves kept (a minute at 60 fps)
+CAPACITY = 3600
+# seconds between exports
+EXPORT_EVERY = 10
+# seconds between refreshes of the overlay
+OVERLAY_EVERY = 0.25
+
+
+def _percentiles(values):
+    if not len(values):
+        return {}
+    values = np.asarray(values, dtype=float)
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"mean": float(values.mean()), "p50": float(p50), "p95": float(p95), "p99": float(p99),
+            "max": float(values.max())}
+
+
+def _write_csv(path, fields, rows):
+    tmp = path + ".tmp"
+    with open(tmp, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(fields)
+        writer.writerows(rows)
+    os.replace(tmp, path)
+
+
+class Telemetry:
+    """Records the frames and moves of a running Game (see the module docstring)"""
+
+    def __init__(self, game, out_dir=DEFAULT_DIR, capacity=CAPACITY, export_every=EXPORT_EVERY, overlay=True):
+        from ursina import Text, color, window
+
+        self.game = game
+        self.app = game.ursina_instance
+        self.out_dir = out_dir
+        self.export_every = export_every
+        self.frames = collections.deque(maxlen=capacity)
+        self.moves = collections.deque(maxlen=capacity)
+        self.frame = 0
+        self.clock = 0.0
+        self._next_export = export_every
+        self._next_overlay = 0.0
+
+        self.methods = [name for name in TIMED_METHODS if hasattr(game, name)]
+        self.fields = FRAME_FIELDS + tuple(name + "_ms" for name in self.methods)
+        self._method_time = dict.fromkeys(self.methods, 0.0)
+        for name in self.methods:
+            setattr(game, name, self._timed(name, getattr(game, name)))
+        game.queue.on_move = self._record_move
+
+        # time ursina's whole update (sequences and entity updates) by wrapping its task
+        self._ursina_update = self.app._update
+        self.app.taskMgr.remove(self.app._update_task)
+        self.app._update_task = self.app.taskMgr.add(self._update, "update")
+
+        self.overlay = None
+        if overlay:
+            self.overlay = Text(text="", position=window.top_left + (0.01, -0.01), origin=(-0.5, 0.5),
+                                scale=0.7, color=color.black)
+        os.makedirs(out_dir, exist_ok=True)
+        atexit.register(self.export)
+
+    def _timed(self, name, method):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._method_time[name] += time.perf_counter() - start
+        return timed
+
+    def _record_move(self, move):
+        self.moves.append((move.name, round(move.queued_at, 4), 1000 * (move.started_at - move.queued_at),
+                           1000 * (move.done_at - move.queued_at)))
+
+    def _update(self, task):
+        from ursina import application, scene
+
+        start = time.perf_counter()
+        result = self._ursina_update(task)
+        update_ms = 1000 * (time.perf_counter() - start)
+
+        self.frame += 1
+        self.clock += time.dt
+        self.frames.append((self.frame, round(self.clock, 4), 1000 * time.dt, update_ms, len(application.sequences),
+                            len(scene.entities), len(self.game.queue),
+                            *(1000 * self._method_time[name] for name in self.methods)))
+        for name in self.methods:
+            self._method_time[name] = 0.0
+
+        if self.overlay is not None and self.clock >= self._next_overlay:
+            self._next_overlay = self.clock + OVERLAY_EVERY
+            self.overlay.text = self.overlay_text()
+        if self.clock >= self._next_export:
+            self._next_export = self.clock + self.export_every
+            self.export()
+        return result
+
+    def overlay_text(self):
+        recent = list(self.frames)[-60:]
+        dt = np.mean([f[2] for f in recent])
+        update = np.mean([f[3] for f in recent])
+        last = recent[-1]
+        text = (f"{1000 / dt if dt else 0:.0f} fps  update {update:.2f} ms\n"
+                f"animations {last[4]}  entities {last[5]}  pending {last[6]}")
+        if self.moves:
+            text += f"\nlast move {self.moves[-1][3]:.0f} ms"
+        return text
+
+    def summary(self):
+        frames = np.array([f[1:] for f in self.frames], dtype=float).reshape(-1, len(self.fields) - 1)
+        column = {name: frames[:, i] for i, name in enumerate(self.fields[1:])}
+        return {"frames": len(self.frames), "seconds": self.clock, "dt_ms": _percentiles(column["dt_ms"]),
+                "update_ms": _percentiles(column["update_ms"]),
+                "methods_ms": {name: {"total": float(column[name + "_ms"].sum()),
+                                      "max": float(column[name + "_ms"].max(initial=0))}
+                               for name in self.methods},
+                "moves": len(self.moves), "latency_ms": _percentiles([m[3] for m in self.moves]),
+                "wait_ms": _percentiles([m[2] for m in self.moves])}
+
+    def export(self):
+        """Write the buffered frames and moves and their summary to out_dir"""
+        _write_csv(os.path.join(self.out_dir, "frames.csv"), self.fields, self.frames)
+        _write_csv(os.path.join(self.out_dir, "moves.csv"), MOVE_FIELDS, self.moves)
+        tmp = os.path.join(self.out_dir, "summary.json.tmp")
+        with open(tmp, "w") as f:
+            json.dump(self.summary(), f, indent=1)
+        os.replace(tmp, os.path.join(self.out_dir, "summary.json"))
+
+
+def telemetry_from_env(game):
+    """:return: A Telemetry of game if CUBE_TELEMETRY is set, None otherwise"""
+    out_dir = os.environ.get(ENV_VAR)
+    if not out_dir:
+        return None
+    return Telemetry(game, DEFAULT_DIR if out_dir == "1" else out_dir)
@@ -290,10 +290,6 @@ class Cube:
             return
 
         cube_str = "".join(x for x in cube_str if x not in string.whitespace)
-        import time
-        
-        print(cube_str)
-        time.sleep(10)
         assert len(cube_str) == 54
         self.faces = (
             Piece(pos=RIGHT, colors=(cube_str[28], None, None)),
@@ -606,6 +602,11 @@ DEBUG = False
 
 class Solver:
 
+    # last layer edge algorithms used by last_layer_edges()
+    CYCLE_MOVE = "R R F D Ui R R Di U F R R"
+    H_PATTERN_MOVE = "Ri S Ri Ri S S Ri Fi Fi R Si Si Ri Ri Si R Fi Fi "
+    FISH_MOVE = "Di Li " + H_PATTERN_MOVE + " L D"
+
     def __init__(self, c):
         self.cube = c
         self.colors = c.colors()
@@ -996,9 +997,9 @@ class Solver:
                     br_edge.colors[2] == self.cube.front_color())
 
 
-        cycle_move = "R R F D Ui R R Di U F R R"
-        h_pattern_move = "Ri S Ri Ri S S Ri Fi Fi R Si Si Ri Ri Si R Fi Fi "
-        fish_move = "Di Li " + h_pattern_move + " L D"
+        cycle_move = self.CYCLE_MOVE
+        h_pattern_move = self.H_PATTERN_MOVE
+        fish_move = self.FISH_MOVE
 
         if state1():
             # ideally, convert state1 into state2
@@ -1103,3 +1104,124 @@ class Solver:
         assert self.cube[LEFT + FRONT].colors[2] == self.cube.front_color() and \
                self.cube[LEFT + FRONT].colors[0] == self.cube.left_color()
 
+
+
+import collections
+
+
+class Counters:
+    """Opt-in call counters for the engine hot paths, grouped per Solver stage.
+
+    The counted methods are only wrapped while the counters are enabled and the
+    originals are put back on disable, so nothing is paid when counting is off.
+
+        with Counters() as counters:
+            Solver(cube).solve()
+        print(counters.report())
+    """
+
+    # (counter name, class, attribute)
+    TARGETS = (
+        ('Piece.rotate', Piece, 'rotate'),
+        ('Matrix.__mul__', Matrix, '__mul__'),
+        ('Point', Point, '__init__'),
+        ('Cube._face', Cube, '_face'),
+        ('Cube._slice', Cube, '_slice'),
+        ('Cube.get_piece', Cube, 'get_piece'),
+    )
+    # Solver methods called by Solver.solve(), in order
+    STAGES = ('cross', 'cross_corners', 'second_layer', 'back_face_edges',
+              'last_layer_corners_position', 'last_layer_corners_orientation',
+              'last_layer_edges')
+    OTHER = 'other'
+
+    _active = None
+
+    def __init__(self):
+        self.stage = self.OTHER
+        self.solves = 0
+        self.counts = collections.defaultdict(collections.Counter)
+        self._originals = []
+
+    def __enter__(self):
+        self.enable()
+        return self
+
+    def __exit__(self, *exc):
+        self.disable()
+
+    def enable(self):
+        if Counters._active is not None:
+            raise RuntimeError("Counters are already enabled")
+        Counters._active = self
+        for name, cls, attr in self.TARGETS:
+            self._patch(cls, attr, self._count(name, cls.__dict__[attr]))
+        for stage in self.STAGES:
+            self._patch(Solver, stage, self._enter_stage(stage, Solver.__dict__[stage]))
+        self._patch(Solver, 'solve', self._count_solve(Solver.__dict__['solve']))
+
+    def disable(self):
+        for cls, attr, func in reversed(self._originals):
+            setattr(cls, attr, func)
+        self._originals = []
+        if Counters._active is self:
+            Counters._active = None
+
+    def reset(self):
+        self.solves = 0
+        self.counts.clear()
+
+    def _patch(self, cls, attr, wrapper):
+        self._originals.append((cls, attr, cls.__dict__[attr]))
+        setattr(cls, attr, wrapper)
+
+    def _count(self, name, func):
+        counts = self.counts
+
+        def wrapper(*args, **kwargs):
+            counts[self.stage][name] += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    def _enter_stage(self, stage, func):
+        def wrapper(*args, **kwargs):
+            outer, self.stage = self.stage, stage
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.stage = outer
+        return wrapper
+
+    def _count_solve(self, func):
+        def wrapper(*args, **kwargs):
+            self.solves += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+    def totals(self):
+        total = collections.Counter()
+        for counts in self.counts.values():
+            total.update(counts)
+        return total
+
+    def as_dict(self):
+        """:return: {stage: {counter: count}} plus a 'total' entry and the number of solves"""
+        stages = {stage: dict(self.counts[stage]) for stage in (self.OTHER,) + self.STAGES
+                  if stage in self.counts}
+        stages['total'] = dict(self.totals())
+        return {'solves': self.solves, 'stages': stages}
+
+    def report(self):
+        """:return: A table of the counts per solver stage, averaged per solve"""
+        names = [name for name, _, _ in self.TARGETS]
+        per = max(self.solves, 1)
+        rows = [(stage, self.counts[stage]) for stage in (self.OTHER,) + self.STAGES
+                if stage in self.counts]
+        rows.append(('total', self.totals()))
+
+        width = max(len(stage) for stage, _ in rows)
+        lines = [f"{self.solves} solve(s), counts per solve",
+                 " " * width + "".join(f"{name:>16}" for name in names)]
+        for stage, counts in rows:
+            lines.append(f"{stage:<{width}}" + "".join(f"{counts[name] / per:>16.1f}" for name in names))
+        return "\n".join(lines)
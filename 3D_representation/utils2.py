@@ -1,69 +1,280 @@
+import atexit
+import json
+import os
+import threading
 import numpy as np
-import random
 
-def animation_delay(level:str, mvmts = None):
-    speed = 0
-    mean_solving_time = 0 # 10 minutes
-    std_deviation = 0 #  
+class SimRNG:
+    """Reproducible source of random streams for the simulation code.
+
+    Wraps a numpy SeedSequence and its Generator. spawn() hands out statistically
+    independent child streams for workers or tasks, and state() records everything needed
+    to regenerate a run bit-for-bit with SimRNG.from_state().
+    """
+
+    def __init__(self, seed=None, seed_seq=None):
+        self.seed_seq = seed_seq if seed_seq is not None else np.random.SeedSequence(seed)
+        self.generator = np.random.default_rng(self.seed_seq)
+
+    @property
+    def seed(self):
+        """The root entropy; drawn from the OS when no seed was given"""
+        return self.seed_seq.entropy
+
+    def spawn(self, n):
+        return [SimRNG(seed_seq=child) for child in self.seed_seq.spawn(n)]
+
+    def state(self):
+        return {"seed": self.seed, "spawn_key": list(self.seed_seq.spawn_key)}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(seed_seq=np.random.SeedSequence(state["seed"], spawn_key=state["spawn_key"]))
+
+    def __repr__(self):
+        return f"SimRNG({self.state()})"
+
+
+_default_rng = None
+
+
+def default_rng():
+    """The SimRNG used when no rng is passed; seeded from $SIM_SEED if set"""
+    global _default_rng
+    if _default_rng is None:
+        seed = os.environ.get("SIM_SEED")
+        _default_rng = SimRNG(int(seed) if seed else None)
+    return _default_rng
+
+
+def set_seed(seed):
+    """Reseed the default stream, e.g. at the start of a reproducible run"""
+    global _default_rng
+    _default_rng = SimRNG(seed)
+    return _default_rng
+
+
+def as_generator(rng=None):
+    """:param rng: A SimRNG, a numpy Generator or None for the default stream"""
+    if rng is None:
+        rng = default_rng()
+    return rng.generator if isinstance(rng, SimRNG) else rng
+
+
+def random_choice(options, rng=None):
+    """Pick one of options (a sequence) from the given stream"""
+    return options[int(as_generator(rng).integers(len(options)))]
+
+
+# player level: (mean, std) of the normal distribution of the total solving time, in seconds
+SOLVING_TIME = {"a": (600, 300), "e": (5, 5)}
+
+
+def truncated_normal(mean, std, low, high, size=None, rng=None):
+    """Sample a normal distribution restricted to [low, high] by inverting its CDF.
+    All arguments broadcast against each other, so a whole array is drawn at once.
+    rng is a SimRNG or numpy Generator (the default stream if None)."""
+    # imported here, as it takes a good part of the games' start-up time
+    from scipy.special import log_ndtr, ndtri_exp
+
+    mean, std = np.asarray(mean, dtype=float), np.asarray(std, dtype=float)
+    a = (np.asarray(low, dtype=float) - mean) / std
+    b = (np.asarray(high, dtype=float) - mean) / std
+    if size is None:
+        size = np.broadcast(mean, std, a, b).shape
+    u = as_generator(rng).random(size)
+
+    # work in the lower tail, where the CDF keeps its precision, and with its logarithm,
+    # which stays finite for bounds far in the tail where the CDF itself underflows to 0
+    flip = a > 0
+    lo, hi = np.where(flip, -b, a), np.where(flip, -a, b)
+    log_lo, log_hi = log_ndtr(lo), log_ndtr(hi)
+    # log(p_lo + u * (p_hi - p_lo)), taken relative to p_hi
+    with np.errstate(divide="ignore"):
+        z = ndtri_exp(log_hi + np.log(u + (1 - u) * np.exp(log_lo - log_hi)))
+    z = np.clip(np.where(flip, -z, z), a, b)
+    return mean + std * z
+
+
+def sample_delays(level, mvmts, rng=None):
+    """Vectorized animation_delay: draw one (speed, solved) pair per entry of mvmts.
+
+    Average players ("a") take a time whose per-move speed lies in (0.30, 30); experts ("e")
+    take at least 5 s with a speed under 5. Move counts under 1 are treated as 1. Other
+    levels take no time: (0, 0), as animation_delay always returned for them.
+    """
+    movimientos = np.maximum(np.asarray(mvmts, dtype=float), 1)
+    if level not in SOLVING_TIME:
+        return np.zeros_like(movimientos), np.zeros_like(movimientos)
+    mean_solving_time, std_deviation = SOLVING_TIME[level]
+
+    if level == "a":
+        low, high = 0.30 * movimientos, 30 * movimientos
+    else:
+        # with a single move the expert range is empty; take its lower end
+        low, high = np.full_like(movimientos, 5.0), np.maximum(5 * movimientos, 5.0)
+
+    solved = truncated_normal(mean_solving_time, std_deviation, low, high, rng=rng)
+    return solved / movimientos, solved
+
+
+def animation_delay(level:str, mvmts = None, rng = None):
     movimientos = 20 if mvmts is None else mvmts
-    solved = 0
 
     print("average") if level == "a" else print("expert")
 
-    if level == "a":
-        while speed <= 0.30 or speed >= 30:
-            mean_solving_time = 600 # 10 minuetes
-            std_deviation = 300 
-
-            solved = np.random.normal(mean_solving_time, std_deviation)
-            speed = solved/movimientos
-            
-    elif level == "e":
-        while (speed <= 0 or speed >= 5) or solved < 5:
-            mean_solving_time = 5 # 10 minuetes
-            std_deviation = 5 
-
-            solved = np.random.normal(mean_solving_time, std_deviation)
-            speed = solved/movimientos
-            
+    speed, solved = sample_delays(level, movimientos, rng=rng)
 #     print(f"speed: {movimientos}/")
-    return speed, solved
+    return float(speed), float(solved)
 
 
-def write_to_csv(cube_type, mvmts, time, player_type):
-    
-    with open("times.csv", '+a') as writer:
-        writer.write(f"{cube_type}, {mvmts}, {time}, {player_type}\n")
+# where the games record their solve times
+TIMES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "times.csv")
+
+
+class TimesWriter:
+    """Appends solve-time records to a CSV file without blocking the caller.
+
+    Records are buffered in memory and written by a background thread once max_records
+    are pending or max_delay seconds have passed. The file stays open, and whatever is
+    still buffered is written by close(), which also runs at interpreter exit.
+    """
+
+    def __init__(self, path=TIMES_CSV, max_records=500, max_delay=2.0):
+        self.path = os.path.abspath(path)
+        self.max_records = max_records
+        self.max_delay = max_delay
+
+        self._file = open(self.path, "a")
+        self._buffer = []
+        self._pending = 0
+        self._buffer_lock = threading.Lock()
+        # held while writing, so flushes from different threads keep records in order
+        self._file_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closed = False
+
+        self._thread = threading.Thread(target=self._run, name="TimesWriter", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
 
-        writer.close()
+    def write(self, cube_type, mvmts, time, player_type):
+        self.write_text(f"{cube_type}, {mvmts}, {time}, {player_type}\n")
 
+    def write_text(self, text, records=1):
+        """Queue already formatted lines"""
+        if self._closed:
+            raise ValueError(f"TimesWriter for {self.path} is closed")
+        with self._buffer_lock:
+            self._buffer.append(text)
+            self._pending += records
+            full = self._pending >= self.max_records
+        if full:
+            self._wake.set()
+
+    def flush(self):
+        with self._file_lock:
+            with self._buffer_lock:
+                buffer, self._buffer, self._pending = self._buffer, [], 0
+            if buffer:
+                self._file.write("".join(buffer))
+                self._file.flush()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.max_delay)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush()
+        self._file.close()
+        atexit.unregister(self.close)
+
+
+_writer = None
+
+
+def get_writer():
+    global _writer
+    if _writer is None:
+        _writer = TimesWriter()
+    return _writer
+
+
+def set_times_path(path, **kwargs):
+    """Send the records of write_to_csv to another file (kwargs go to TimesWriter)"""
+    global _writer
+    if _writer is not None:
+        _writer.close()
+    _writer = TimesWriter(path, **kwargs)
+
+
+def write_to_csv(cube_type, mvmts, time, player_type):
+    get_writer().write(cube_type, mvmts, time, player_type)
 
-def gen_data():
 
-    # options
-    cube_types = ["3x3", "3x3V2", "floppy", "2x2"]
-    player_types = ["a", "e"]
-    ct = random.choice(cube_types)
-    pt = random.choice(player_types)
+CUBE_TYPES = ["3x3", "3x3V2", "floppy", "2x2"]
+PLAYER_TYPES = ["a", "e"]
+# cube type: (mean, std) of the normal distribution of the number of moves
+MOVES_DIST = {"3x3": (20, 5), "3x3V2": (20, 5), "floppy": (5, 1), "2x2": (15, 3)}
 
-    moves = 0
 
-    if ct == "3x3" or ct == "3x3V2":
-        moves = int(np.random.normal(20, 5))
+def gen_columns(n, rng=None):
+    """Draw n random records as columns: (cube type codes, moves, time, player codes).
+    Codes index CUBE_TYPES and PLAYER_TYPES."""
+    rng = as_generator(rng)
+    ct = rng.integers(len(CUBE_TYPES), size=n)
+    pt = rng.integers(len(PLAYER_TYPES), size=n)
 
-    elif ct == "floppy":
-        moves = int(np.random.normal(5, 1))
+    mean, std = np.array([MOVES_DIST[c] for c in CUBE_TYPES], dtype=float).T
+    moves = np.trunc(rng.normal(mean[ct], std[ct])).astype(np.int64)
 
-    elif ct == "2x2":
-        moves = int(np.random.normal(15, 3))
+    times = np.empty(n)
+    for code, level in enumerate(PLAYER_TYPES):
+        rows = pt == code
+        _, times[rows] = sample_delays(level, moves[rows], rng=rng)
+    return ct, moves, times, pt
 
-    _, Stime = animation_delay(pt, moves)
 
-    write_to_csv(ct, moves, Stime, pt)
+def format_rows(ct, moves, times, pt):
+    """Lines in the times.csv format for the given columns"""
+    cube_types = np.array(CUBE_TYPES, dtype=object)[ct].tolist()
+    players = np.array(PLAYER_TYPES, dtype=object)[pt].tolist()
+    return "".join([f"{c}, {m}, {t}, {p}\n"
+                    for c, m, t, p in zip(cube_types, moves.tolist(), times.tolist(), players)])
 
 
-# for _ in range(500):
-#     gen_data()
+def gen_data(n=1, seed=None, path=TIMES_CSV, chunk_size=1000000, rng=None):
+    """Append n random records to path, generated and written chunk_size rows at a time.
+    Uses the same per cube type distributions as the games.
 
+    The stream is rng, SimRNG(seed) if seed is given, or else a new child of the default
+    stream. For bulk (n > 1) or seeded generation its state is appended to path + ".seeds"
+    so the rows can be regenerated (an rng passed in should be unused for that record to be
+    complete); a single unseeded record is not logged.
+    :return: The SimRNG used
+    """
+    seeded = seed is not None or rng is not None
+    if rng is None:
+        rng = SimRNG(seed) if seed is not None else default_rng().spawn(1)[0]
+    state = rng.state() if isinstance(rng, SimRNG) else None
+    # records still buffered by write_to_csv go first
+    if _writer is not None and _writer.path == os.path.abspath(path):
+        _writer.flush()
+    with open(path, "a") as writer:
+        first_row = writer.tell()
+        for start in range(0, n, chunk_size):
+            writer.write(format_rows(*gen_columns(min(chunk_size, n - start), rng)))
+    if seeded or n > 1:
+        with open(path + ".seeds", "a") as log:
+            log.write(json.dumps({"rng": state, "rows": n, "chunk_size": chunk_size, "offset": first_row}) + "\n")
+    return rng
 
 
+# gen_data(500)
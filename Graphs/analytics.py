@@ -0,0 +1,320 @@
+"""Aggregates and figures behind graficas.ipynb.
+
+Everything the notebook plots is computed from times.csv in a single read and cached in
+a JSON file next to it, keyed by the file's size and modification time, so re-running the
+notebook only reads the small cache until the data changes:
+
+    import analytics
+    agg = analytics.load("times.csv")
+    analytics.plot_overview(agg)
+    analytics.plot_moves_by_type(agg, ["3x3", "3x3V2"])
+
+The scatter plots switch to a 2D density (counts on a fixed grid, computed once with the
+other aggregates) when there are more rows than sampled points, so drawing them costs the
+same for a thousand rows or a hundred million.
+
+The source can also be a store directory (see 3D_representation/store.py).
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "3D_representation"))
+
+from stats import SolveStats  # noqa: E402
+from store import COLUMNS as STORE_COLUMNS, TimesStore, read_csv  # noqa: E402
+
+TIMES_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "times.csv")
+COLUMNS = ["TIpo", "Movimientos", "Tiempo", "Jugador"]
+
+# bump when the cached aggregates change
+CACHE_VERSION = 2
+TIME_BINS = 15
+MOVES_BINS = 10
+# points kept for the scatter plots and the boxplot outliers
+MAX_POINTS = 20000
+MAX_FLIERS = 2000
+# (moves, time) cells of the density grid
+DENSITY_BINS = (200, 200)
+
+_memory = {}
+
+
+def read_times(path=TIMES_CSV):
+    """:return: The records of a times.csv file or a store directory as a DataFrame"""
+    if os.path.isdir(path):
+        df = TimesStore(path).to_pandas()
+        df.columns = COLUMNS
+    else:
+        chunks = [pd.DataFrame(chunk) for chunk in read_csv(path)]
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame(columns=list(STORE_COLUMNS))
+        df.columns = COLUMNS
+    return df.astype({"TIpo": str, "Jugador": str})
+
+
+def source_key(path):
+    """:return: What the cache of path is valid for: its size and modification time"""
+    stat_path = os.path.join(path, "meta.json") if os.path.isdir(path) else path
+    stat = os.stat(stat_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "version": CACHE_VERSION,
+            "max_points": MAX_POINTS, "density_bins": list(DENSITY_BINS)}
+
+
+def cache_path(path):
+    return os.path.join(path, "analytics.json") if os.path.isdir(path) else path + ".analytics.json"
+
+
+def _hist(values, bins):
+    counts, edges = np.histogram(values, bins=bins)
+    return {"counts": counts.tolist(), "edges": edges.tolist()}
+
+
+def _box(values):
+    """Boxplot statistics as matplotlib's Axes.bxp() takes them (whiskers at 1.5 IQR)"""
+    values = np.sort(values)
+    q1, med, q3 = np.percentile(values, [25, 50, 75])
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    fliers = values[(values < inside[0]) | (values > inside[-1])]
+    if len(fliers) > MAX_FLIERS:
+        fliers = fliers[np.linspace(0, len(fliers) - 1, MAX_FLIERS).round().astype(int)]
+    return {"med": float(med), "q1": float(q1), "q3": float(q3), "whislo": float(inside[0]),
+            "whishi": float(inside[-1]), "mean": float(values.mean()), "fliers": fliers.tolist()}
+
+
+def stratified_sample(df, n, by=("TIpo", "Jugador"), seed=0):
+    """
+    :return: At most n rows of df, in their original order, keeping every group of `by`:
+        groups get an equal share, and what small groups cannot use goes to the larger ones
+    """
+    if len(df) <= n:
+        return df
+    rng = np.random.default_rng(seed)
+    groups = sorted(df.groupby(list(by), sort=True).indices.values(), key=len)
+    keep = []
+    for i, rows in enumerate(groups):
+        quota = min(len(rows), n // (len(groups) - i))
+        keep.append(rng.choice(rows, quota, replace=False))
+        n -= quota
+    return df.iloc[np.sort(np.concatenate(keep))]
+
+
+def _density(df, players):
+    """Counts of (moves, time) on a DENSITY_BINS grid per player, stored sparsely"""
+    moves, times = df["Movimientos"].to_numpy(), df["Tiempo"].to_numpy()
+    # whole moves get a cell each when they fit
+    nx = min(DENSITY_BINS[0], int(moves.max() - moves.min()) + 1)
+    x_edges = np.linspace(moves.min() - 0.5, moves.max() + 0.5, nx + 1)
+    y_edges = np.linspace(times.min(), times.max(), DENSITY_BINS[1] + 1)
+
+    jugador = df["Jugador"].to_numpy()
+    groups = {}
+    for player in players:
+        rows = jugador == player
+        counts = np.histogram2d(moves[rows], times[rows], bins=[x_edges, y_edges])[0].astype(np.int64).ravel()
+        index = np.flatnonzero(counts)
+        groups[player] = {"index": index.tolist(), "counts": counts[index].tolist()}
+    return {"x_edges": x_edges.tolist(), "y_edges": y_edges.tolist(), "players": groups}
+
+
+def aggregate(df):
+    """:return: Every aggregate the figures need, as a JSON-serializable dict"""
+    types = pd.unique(df["TIpo"]).tolist()
+    players = pd.unique(df["Jugador"]).tolist()
+
+    points = stratified_sample(df, MAX_POINTS)
+
+    stats = SolveStats()
+    stats.update(df["TIpo"].to_numpy(), df["Movimientos"].to_numpy(), df["Tiempo"].to_numpy(),
+                 df["Jugador"].to_numpy())
+
+    by_type = {tipo: group for tipo, group in df.groupby("TIpo", sort=False)}
+    return {
+        "rows": len(df),
+        "types": types,
+        "players": players,
+        "box_tiempo": {tipo: _box(by_type[tipo]["Tiempo"].to_numpy()) for tipo in types},
+        "hist_tiempo": {tipo: _hist(by_type[tipo]["Tiempo"], TIME_BINS) for tipo in types},
+        "hist_movimientos": {tipo: _hist(by_type[tipo]["Movimientos"], MOVES_BINS) for tipo in types},
+        "mean_movimientos": df.groupby("Jugador", sort=True)["Movimientos"].mean().to_dict(),
+        "points": {
+            "movimientos": points["Movimientos"].tolist(),
+            "tiempo": points["Tiempo"].tolist(),
+            "tipo": [types.index(t) for t in points["TIpo"]],
+            "jugador": [players.index(j) for j in points["Jugador"]],
+        },
+        "density": _density(df, players),
+        "stats": stats.to_dict(),
+    }
+
+
+def load(path=TIMES_CSV, cache=True):
+    """
+    :param path: A times.csv file or a store directory
+    :param cache: Read and write the JSON cache next to path
+    :return: The aggregates of path, recomputed only if it changed since they were cached
+    """
+    path = os.path.abspath(path)
+    key = source_key(path)
+    if _memory.get(path, {}).get("key") == key:
+        return _memory[path]["aggregates"]
+
+    cached = None
+    if cache and os.path.exists(cache_path(path)):
+        with open(cache_path(path)) as f:
+            cached = json.load(f)
+    if cached is None or cached["key"] != key:
+        cached = {"key": key, "aggregates": aggregate(read_times(path))}
+        if cache:
+            tmp = cache_path(path) + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump(cached, f)
+            os.replace(tmp, cache_path(path))
+
+    _memory[path] = cached
+    return cached["aggregates"]
+
+
+def solve_stats(agg):
+    """:return: The stats.SolveStats summary of the aggregates"""
+    return SolveStats.from_dict(agg["stats"])
+
+
+def summary(agg):
+    """:return: One row per (cube type, player): records, mean/min/median/max of the moves
+    and the time, from the aggregates instead of the records"""
+    stats = solve_stats(agg)
+    rows = []
+    for tipo, jugador in stats.keys():
+        group = stats[(tipo, jugador)]
+        row = {"TIpo": tipo, "Jugador": jugador, "Registros": group["tiempo"].count}
+        for column, name in (("movimientos", "Movimientos"), ("tiempo", "Tiempo")):
+            values = group[column]
+            row.update({f"{name} media": values.mean, f"{name} min": values.min,
+                        f"{name} mediana": values.quantile(0.5), f"{name} max": values.max})
+        rows.append(row)
+    return pd.DataFrame(rows).set_index(["TIpo", "Jugador"])
+
+
+def density_grid(agg, players=None):
+    """:return: (x_edges, y_edges, counts) with counts[i, j] the rows of the given players
+        (all by default) in moves bin i and time bin j"""
+    density = agg["density"]
+    x_edges, y_edges = np.asarray(density["x_edges"]), np.asarray(density["y_edges"])
+    counts = np.zeros((len(x_edges) - 1) * (len(y_edges) - 1), dtype=np.int64)
+    for player, group in density["players"].items():
+        if players is None or player in players:
+            counts[group["index"]] += group["counts"]
+    return x_edges, y_edges, counts.reshape(len(x_edges) - 1, len(y_edges) - 1)
+
+
+def _use_density(agg, mode):
+    if mode not in ("auto", "density", "scatter"):
+        raise ValueError(f"Unknown mode: {mode!r}")
+    # the cached points are every row unless the data was downsampled
+    return mode == "density" or (mode == "auto" and agg["rows"] > len(agg["points"]["tiempo"]))
+
+
+def plot_density(ax, agg, players=None, cmap='viridis'):
+    """Draw the density of (moves, time) of the given players on ax, on a log color scale"""
+    from matplotlib.colors import LogNorm
+
+    x_edges, y_edges, counts = density_grid(agg, players)
+    mesh = ax.pcolormesh(x_edges, y_edges, np.ma.masked_equal(counts, 0).T, cmap=cmap,
+                         norm=LogNorm(vmin=1, vmax=max(int(counts.max()), 1)))
+    ax.figure.colorbar(mesh, ax=ax, label='Registros')
+    return mesh
+
+
+def _plot_hist(ax, hist, **kwargs):
+    edges = np.asarray(hist["edges"])
+    ax.hist(edges[:-1], bins=edges, weights=hist["counts"], **kwargs)
+
+
+def plot_time_boxplot(agg, ax):
+    types = sorted(agg["types"])
+    ax.bxp([agg["box_tiempo"][tipo] for tipo in types], showfliers=True)
+    ax.set_xticks(range(1, len(types) + 1), types)
+    ax.set_xlabel('TIpo')
+    ax.set_title('Boxplot del Tiempo de Resolución por Tipo de Cubo')
+
+
+def plot_overview(agg, mode="auto"):
+    """The 2x2 grid of the notebook.
+    :param mode: "scatter" of the sampled points, "density" of every row, or "auto" to use
+        the density only when the points are a sample
+    :return: The figure"""
+    import matplotlib.pyplot as plt
+
+    fig, axs = plt.subplots(2, 2, figsize=(12, 10))
+
+    plot_time_boxplot(agg, axs[0, 0])
+
+    points = agg["points"]
+    if _use_density(agg, mode):
+        plot_density(axs[0, 1], agg)
+    else:
+        axs[0, 1].scatter(points["movimientos"], points["tiempo"], c=points["tipo"], cmap='viridis', s=50)
+    axs[0, 1].set_title('Cantidad de Movimientos vs Tiempo')
+    axs[0, 1].set_xlabel('Cantidad de Movimientos')
+    axs[0, 1].set_ylabel('Tiempo de Resolución')
+
+    for tipo in agg["types"]:
+        _plot_hist(axs[1, 0], agg["hist_tiempo"][tipo], alpha=0.5, label=tipo)
+    axs[1, 0].set_title('Histograma del Tiempo de Resolución por Tipo de Cubo')
+    axs[1, 0].legend()
+
+    means = agg["mean_movimientos"]
+    axs[1, 1].bar(list(means), list(means.values()), color=['skyblue', 'lightcoral'])
+    axs[1, 1].set_title('Promedio de Movimientos por Tipo de Jugador')
+    axs[1, 1].set_ylabel('Promedio de Movimientos')
+
+    fig.tight_layout()
+    return fig
+
+
+def plot_time_vs_moves_by_player(agg, mode="auto"):
+    """Moves vs time per player: a scatter, or one density panel per player (see plot_overview)"""
+    import matplotlib.pyplot as plt
+
+    if _use_density(agg, mode):
+        players = agg["players"]
+        fig, axs = plt.subplots(1, len(players), figsize=(10, 6), sharex=True, sharey=True, squeeze=False)
+        for ax, player in zip(axs[0], players):
+            plot_density(ax, agg, [player])
+            ax.set_title(player)
+            ax.set_xlabel('Cantidad de movimientos')
+        axs[0, 0].set_ylabel('Tiempo de resolución')
+        fig.suptitle('Tiempo de resolución según la cantidad de movimientos')
+        fig.tight_layout()
+        return fig
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    points = agg["points"]
+    jugador = np.asarray(points["jugador"], dtype=int)
+    moves, times = np.asarray(points["movimientos"]), np.asarray(points["tiempo"])
+    for i, player in enumerate(agg["players"]):
+        ax.scatter(moves[jugador == i], times[jugador == i], label=player)
+    ax.set_title('Tiempo de resolución según la cantidad de movimientos')
+    ax.set_xlabel('Cantidad de movimientos')
+    ax.set_ylabel('Tiempo de resolución')
+    ax.legend()
+    return fig
+
+
+def plot_moves_by_type(agg, types=None, title='Cantidad de movimientos según el tipo de cubo'):
+    """Histograms of the moves of the given cube types (all by default)"""
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for tipo in agg["types"]:
+        if types is None or tipo in types:
+            _plot_hist(ax, agg["hist_movimientos"][tipo], alpha=0.5, label=tipo)
+    ax.set_title(title)
+    ax.set_xlabel('Cantidad de movimientos')
+    ax.set_ylabel('Frecuencia')
+    ax.legend()
+    return fig